@@ -19,12 +19,16 @@ class UserAdmin(admin.ModelAdmin):
 @admin.register(Pin, site=bopmaps_admin_site)
 class PinAdmin(admin.ModelAdmin):
     list_display = ('title', 'owner', 'created_at', 'is_private')
+    # Only the owner is rendered; the default select_related() also joins the skin
+    list_select_related = ('owner',)
     search_fields = ('title', 'description')
     list_filter = ('is_private', 'created_at')
 
 @admin.register(PinInteraction, site=bopmaps_admin_site)
 class PinInteractionAdmin(admin.ModelAdmin):
     list_display = ('user', 'pin', 'interaction_type', 'created_at')
+    # Pin.__str__ only needs the pin row; don't follow pin -> owner/skin
+    list_select_related = ('user', 'pin')
     list_filter = ('interaction_type', 'created_at')
 
 # Register Friends models
@@ -18,6 +18,17 @@ class RequestLogMiddleware(MiddlewareMixin):
         if hasattr(request, 'start_time'):
             duration = time.time() - request.start_time
             
+            if response.status_code >= 500:
+                level = logging.ERROR
+            elif response.status_code >= 400:
+                level = logging.WARNING
+            else:
+                level = logging.INFO
+                
+            # Skip building and serialising the log entry when it would be dropped
+            if not logger.isEnabledFor(level):
+                return response
+            
             # Get user info
             user = None
             user_id = None
@@ -41,12 +52,7 @@ class RequestLogMiddleware(MiddlewareMixin):
                 log_data['query_params'] = dict(request.GET.items())
                 
             # Log the request
-            if response.status_code >= 500:
-                logger.error(f"Request: {json.dumps(log_data)}")
-            elif response.status_code >= 400:
-                logger.warning(f"Request: {json.dumps(log_data)}")
-            else:
-                logger.info(f"Request: {json.dumps(log_data)}")
+            logger.log(level, "Request: %s", json.dumps(log_data))
                 
         return response
 
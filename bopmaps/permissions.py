@@ -14,7 +14,12 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
             
-        # Write permissions are only allowed to the owner
+        # Write permissions are only allowed to the owner. Compare the foreign
+        # key column when there is one, so the owner row isn't loaded
+        owner_id = getattr(obj, f"{self.owner_field}_id", None)
+        if owner_id is not None:
+            return owner_id == request.user.pk
+            
         owner = getattr(obj, self.owner_field, None)
         if owner is None:
             logger.warning(f"Owner field '{self.owner_field}' not found on {obj.__class__.__name__}")
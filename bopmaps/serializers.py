@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from rest_framework.utils import model_meta
 import logging
 
 logger = logging.getLogger('bopmaps')
@@ -26,6 +27,29 @@ class BaseSerializer(serializers.ModelSerializer):
             
         return valid
     
+    def update(self, instance, validated_data):
+        """
+        Save only the submitted columns (plus any auto_now timestamps)
+        instead of rewriting every column of the row
+        """
+        info = model_meta.get_field_info(instance)
+        has_many_to_many = any(
+            field in info.relations and info.relations[field].to_many
+            for field in validated_data
+        )
+        if not validated_data or has_many_to_many:
+            return super().update(instance, validated_data)
+            
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+            
+        update_fields = list(validated_data) + [
+            field.name for field in instance._meta.concrete_fields
+            if getattr(field, 'auto_now', False)
+        ]
+        instance.save(update_fields=update_fields)
+        return instance
+    
     def to_representation(self, instance):
         """
         Enhanced representation method with error handling
@@ -45,9 +69,15 @@ class BaseReadOnlySerializer(serializers.ModelSerializer):
     Use this for serializers that will only be used for GET requests
     to improve performance.
     """
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.Meta.read_only_fields = [field.name for field in self.Meta.model._meta.fields]
+    def __init_subclass__(cls, **kwargs):
+        """
+        Resolve the read-only field list once per serializer class
+        instead of re-introspecting the model on every instantiation
+        """
+        super().__init_subclass__(**kwargs)
+        meta = getattr(cls, 'Meta', None)
+        if meta is not None and hasattr(meta, 'model'):
+            meta.read_only_fields = [field.name for field in meta.model._meta.fields]
 
 
 class TimeStampedModelSerializer(BaseSerializer):
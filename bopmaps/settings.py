@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 import os
+import warnings
 from datetime import timedelta
 from pathlib import Path
 from decouple import config
@@ -184,7 +185,7 @@ if not DEBUG:
             DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
             MEDIA_URL = f'https://{AWS_S3_CUSTOM_DOMAIN}/'
     else:
-        print("WARNING: AWS credentials not fully configured. Using local storage instead.")
+        warnings.warn("AWS credentials not fully configured. Using local storage instead.")
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -255,6 +256,19 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+# Tasks vary from a single cache write to multi-minute tile downloads, so
+# workers take one task at a time. Late acks (redelivery after a worker
+# crash) are enabled per task, only on tasks that are safe to run twice.
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_BROKER_TRANSPORT_OPTIONS = {'visibility_timeout': 3600}  # Longer than the slowest bundle task
+# Long-running geo tasks can be moved to their own queue so they don't delay
+# the small request-triggered tasks; defaults to the shared queue
+CELERY_BULK_QUEUE = config('CELERY_BULK_QUEUE', default='celery')
+CELERY_TASK_ROUTES = {
+    'geo.tasks.create_region_bundle': {'queue': CELERY_BULK_QUEUE},
+    'geo.tasks.import_osm_data': {'queue': CELERY_BULK_QUEUE},
+    'geo.tasks.cleanup_*': {'queue': CELERY_BULK_QUEUE},
+}
 
 # Channels Settings
 ASGI_APPLICATION = 'bopmaps.asgi.application'
@@ -377,6 +391,14 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'geo.tasks.monitor_storage_usage',
         'schedule': timedelta(hours=1),  # Run hourly
     },
+    'refresh-pin-analytics': {
+        'task': 'pins.tasks.refresh_pin_analytics',
+        'schedule': timedelta(hours=1),  # Run hourly
+    },
+    'lift-expired-bans': {
+        'task': 'users.tasks.lift_expired_bans',
+        'schedule': timedelta(hours=1),  # Run hourly
+    },
 }
 
 # Cache Settings for static files using CDN
@@ -7,11 +7,15 @@ from django.utils import timezone
 from django.db import transaction
 import logging
 from django.views.generic import TemplateView
+from django.views.decorators.cache import cache_page
+from django.utils.decorators import method_decorator
+from django.conf import settings
 
 logger = logging.getLogger('bopmaps')
 
+@method_decorator(cache_page(settings.CACHE_MIDDLEWARE_SECONDS), name='dispatch')
 class IndexView(TemplateView):
-    """Landing page for BOPMaps demo"""
+    """Landing page for BOPMaps demo (static, so the rendered page is cached)"""
     template_name = 'index.html'
 
 class BaseModelViewSet(viewsets.ModelViewSet):
@@ -11,7 +11,9 @@ This module implements a multi-level caching strategy for map data including:
 import json
 import hashlib
 import time
-from typing import Any, Dict, List, Optional, Tuple, Union
+from decimal import Decimal, ROUND_DOWN
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 from django.core.cache import cache
 from django.conf import settings
 from django.contrib.gis.geos import Point, Polygon
@@ -44,6 +46,18 @@ CACHE_TIMEOUTS = {
 }
 
 
+@lru_cache(maxsize=None)
+def _grid_quantum(precision: int) -> Decimal:
+    """Decimal step for a grid precision, e.g. 2 -> Decimal('0.01')"""
+    return Decimal(1).scaleb(-precision)
+
+
+def _truncate(value: float, quantum: Decimal) -> float:
+    """Truncate a coordinate towards zero to a multiple of quantum"""
+    # + 0.0 turns -0.0 into 0.0, so small negative values keep the 0.0 key
+    return float(Decimal(str(float(value))).quantize(quantum, rounding=ROUND_DOWN)) + 0.0
+
+
 class SpatialCache:
     """
     Implements spatial caching strategies for geographic data.
@@ -62,9 +76,10 @@ class SpatialCache:
         Returns:
             Tuple of grid cell coordinates (lat_grid, lng_grid)
         """
-        factor = 10 ** precision
-        return (int(float(lat) * factor) / factor, 
-                int(float(lng) * factor) / factor)
+        # Truncate in decimal: float scaling puts values like 0.57 in the
+        # 0.56 cell (0.57 * 100 == 56.99...)
+        quantum = _grid_quantum(precision)
+        return (_truncate(lat, quantum), _truncate(lng, quantum))
     
     @staticmethod
     def get_cache_key(prefix: str, lat: float, lng: float, zoom: int = None, 
@@ -121,7 +136,7 @@ class SpatialCache:
         
         if REDIS_AVAILABLE:
             # Use Redis to find matching keys
-            return [key.decode('utf-8') for key in redis_client.keys(pattern)]
+            return [key.decode('utf-8') for key in redis_client.scan_iter(match=pattern, count=500)]
         else:
             # Without Redis, we can't easily search for keys
             # This is a limitation when using the default cache backend
@@ -148,36 +163,42 @@ class SpatialCache:
         # Get bounding box
         minx, miny, maxx, maxy = bounds.extent
         
-        # Generate all grid cells within this bounding box
-        factor = 10 ** precision
-        
-        min_lat_grid = int(miny * factor) / factor
-        max_lat_grid = int(maxy * factor) / factor
-        min_lng_grid = int(minx * factor) / factor
-        max_lng_grid = int(maxx * factor) / factor
-        
-        # Generate patterns for all cells
-        patterns = []
-        
-        # Iterate through all grid cells in the bounding box
-        lat_grid = min_lat_grid
-        while lat_grid <= max_lat_grid:
-            lng_grid = min_lng_grid
-            while lng_grid <= max_lng_grid:
-                pattern = f"{prefix}:grid:{lat_grid}:{lng_grid}:*"
-                patterns.append(pattern)
-                lng_grid = (int(lng_grid * factor) + 1) / factor
+        # Corner cells come from get_grid_cell so the bounds land in the same
+        # cells as the cached keys; step between them in Decimal, since float
+        # steps can stall (e.g. (int(0.57 * 100) + 1) / 100 == 0.57)
+        quantum = _grid_quantum(precision)
+        min_lat_grid, min_lng_grid = SpatialCache.get_grid_cell(miny, minx, precision)
+        max_lat_grid, max_lng_grid = SpatialCache.get_grid_cell(maxy, maxx, precision)
+        max_lat = Decimal(str(max_lat_grid))
+        max_lng = Decimal(str(max_lng_grid))
+        
+        # Collect every cell in the bounding box, formatted like
+        # get_cache_key, which writes the float values
+        cells = set()
+        lat_grid = Decimal(str(min_lat_grid))
+        while lat_grid <= max_lat:
+            lng_grid = Decimal(str(min_lng_grid))
+            while lng_grid <= max_lng:
+                cells.add(f"{float(lat_grid) + 0.0}:{float(lng_grid) + 0.0}")
+                lng_grid += quantum
                 
-            lat_grid = (int(lat_grid * factor) + 1) / factor
+            lat_grid += quantum
             
-        # Delete all matching keys
-        count = 0
-        for pattern in patterns:
-            keys = redis_client.keys(pattern)
-            if keys:
-                count += len(keys)
-                for key in keys:
-                    redis_client.delete(key)
+        # One SCAN over the prefix (each SCAN walks the whole keyspace, so
+        # not one per cell), match cells client-side, then one pipelined DEL
+        grid_prefix = f"{prefix}:grid:"
+        keys = []
+        for key in redis_client.scan_iter(match=f"{grid_prefix}*", count=500):
+            cell = ':'.join(key.decode('utf-8')[len(grid_prefix):].split(':')[:2])
+            if cell in cells:
+                keys.append(key)
+                
+        count = len(keys)
+        if keys:
+            pipe = redis_client.pipeline(transaction=False)
+            for start in range(0, count, 500):
+                pipe.delete(*keys[start:start + 500])
+            pipe.execute()
                     
         return count
 
@@ -217,6 +238,39 @@ class MapCache:
         cache_key = f"osm_tile:{z}:{x}:{y}"
         cache.set(cache_key, data, timeout=CACHE_TIMEOUTS['tile'])
     
+    @staticmethod
+    def get_tiles(z: int, x: int, ys: Iterable[int]) -> Dict[int, bytes]:
+        """
+        Get a column of map tiles from cache in one round trip.
+        
+        Args:
+            z: Zoom level
+            x: X coordinate
+            ys: Y coordinates to fetch
+            
+        Returns:
+            Dict mapping each cached y coordinate to its tile data
+        """
+        keys = {f"osm_tile:{z}:{x}:{y}": y for y in ys}
+        return {keys[key]: data for key, data in cache.get_many(keys).items()}
+    
+    @staticmethod
+    def add_tile(z: int, x: int, y: int, data: bytes) -> bool:
+        """
+        Store a map tile in cache only if it isn't cached already.
+        
+        Args:
+            z: Zoom level
+            x: X coordinate
+            y: Y coordinate
+            data: Tile image data
+            
+        Returns:
+            True if the tile was stored, False if it was already cached
+        """
+        cache_key = f"osm_tile:{z}:{x}:{y}"
+        return cache.add(cache_key, data, timeout=CACHE_TIMEOUTS['tile'])
+    
     @staticmethod
     def get_tile_metadata(cache_key: str, metadata_key: str) -> Optional[str]:
         """
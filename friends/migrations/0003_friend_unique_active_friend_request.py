@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("friends", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="friend",
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name="friend",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status__in", ["pending", "accepted"])),
+                fields=("requester", "recipient"),
+                name="unique_active_friend_request",
+            ),
+        ),
+    ]
@@ -26,7 +26,14 @@ class Friend(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
-        unique_together = ('requester', 'recipient')
+        constraints = [
+            # Only one live request per pair; rejected rows are kept as history
+            models.UniqueConstraint(
+                fields=['requester', 'recipient'],
+                condition=models.Q(status__in=['pending', 'accepted']),
+                name='unique_active_friend_request',
+            ),
+        ]
         
     def __str__(self):
-        return f"{self.requester.username} -> {self.recipient.username} ({self.status})"
+        return f"User {self.requester_id} -> user {self.recipient_id} ({self.status})"
@@ -59,4 +59,4 @@ class UserAchievement(models.Model):
         unique_together = ('user', 'achievement')
     
     def __str__(self):
-        return f"{self.user.username} - {self.achievement.name}"
+        return f"User {self.user_id} - achievement {self.achievement_id}"
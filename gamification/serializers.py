@@ -19,17 +19,25 @@ class PinSkinSerializer(TimeStampedModelSerializer):
         """
         Check if the current user owns this skin.
         """
-        user = self.context.get('request').user
+        request = self.context.get('request')
+        user = request.user if request else None
         if not user or not user.is_authenticated:
             return False
             
         # If user hasn't unlocked this premium skin yet
         if obj.is_premium:
-            # Check if user has completed an achievement that rewards this skin
-            return Achievement.objects.filter(
-                reward_skin=obj,
-                completions__user=user
-            ).exists()
+            # Premium skins are unlocked by completing an achievement that
+            # rewards them; load the user's unlocked skin ids once per
+            # serialization pass instead of querying for every skin
+            context = self.context
+            if 'unlocked_skin_ids' not in context:
+                context['unlocked_skin_ids'] = set(
+                    Achievement.objects.filter(
+                        completions__user=user,
+                        reward_skin__isnull=False
+                    ).values_list('reward_skin_id', flat=True)
+                )
+            return obj.pk in context['unlocked_skin_ids']
             
         # Non-premium skins are available to everyone
         return True
@@ -52,35 +60,36 @@ class AchievementSerializer(BaseSerializer):
         ]
         read_only_fields = ['id', 'is_completed', 'progress']
         
+    def _user_achievements(self):
+        """
+        Map achievement id -> progress for the requesting user, loaded with
+        one query per serialization pass instead of two per achievement.
+        """
+        context = self.context
+        if 'user_achievements' not in context:
+            request = context.get('request')
+            user = request.user if request else None
+            if not user or not user.is_authenticated:
+                context['user_achievements'] = {}
+            else:
+                context['user_achievements'] = dict(
+                    UserAchievement.objects.filter(user=user).values_list(
+                        'achievement_id', 'progress'
+                    )
+                )
+        return context['user_achievements']
+        
     def get_is_completed(self, obj):
         """
         Check if the current user has completed this achievement.
         """
-        user = self.context.get('request').user
-        if not user or not user.is_authenticated:
-            return False
-            
-        return UserAchievement.objects.filter(
-            user=user, 
-            achievement=obj
-        ).exists()
+        return obj.pk in self._user_achievements()
         
     def get_progress(self, obj):
         """
         Get the current user's progress towards this achievement.
         """
-        user = self.context.get('request').user
-        if not user or not user.is_authenticated:
-            return {}
-            
-        try:
-            user_achievement = UserAchievement.objects.get(
-                user=user, 
-                achievement=obj
-            )
-            return user_achievement.progress
-        except UserAchievement.DoesNotExist:
-            return {}
+        return self._user_achievements().get(obj.pk, {})
 
 
 class UserAchievementSerializer(TimeStampedModelSerializer):
@@ -2,6 +2,8 @@ import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.gis.geos import Point
+from django.db import transaction
+from django.utils import timezone
 from users.models import User
 from geo.models import UserLocation
 import logging
@@ -77,18 +79,23 @@ class LocationConsumer(AsyncWebsocketConsumer):
         try:
             location = Point(float(lng), float(lat))
             
-            # Create location record
-            UserLocation.objects.create(
-                user=self.user,
-                location=location
-            )
-            
-            # Update user's current location if the model has that field
-            if hasattr(self.user, 'current_location'):
-                self.user.current_location = location
-                self.user.save(update_fields=['current_location'])
+            # Write the history row and the current location in one
+            # transaction so each update costs a single commit
+            with transaction.atomic():
+                # Create location record
+                UserLocation.objects.create(
+                    user=self.user,
+                    location=location
+                )
+                
+                # Update the user's current location with a single UPDATE; the
+                # scope user is shared across messages, so avoid a full save
+                User.objects.filter(pk=self.user.pk).update(
+                    location=location,
+                    last_location_update=timezone.now()
+                )
             
-            logger.info(f"Updated location for user {self.user.username}")
+            logger.debug("Updated location for user %s", self.user.pk)
             return True
         except Exception as e:
             logger.error(f"Error saving user location: {str(e)}")
@@ -5,6 +5,7 @@ Middleware for optimizing map-related requests and caching
 import time
 import logging
 import re
+from collections import deque
 from django.utils.deprecation import MiddlewareMixin
 from django.conf import settings
 from django.core.cache import caches, cache
@@ -34,6 +35,7 @@ class MapTileOptimizationMiddleware(MiddlewareMixin):
         super().__init__(get_response)
         self.tile_cache = caches['tiles'] if 'tiles' in settings.CACHES else caches['default']
         self.request_counts = {}
+        self._last_sweep = time.time()
         
     def process_request(self, request):
         """
@@ -60,21 +62,30 @@ class MapTileOptimizationMiddleware(MiddlewareMixin):
         client_ip = self._get_client_ip(request)
         now = time.time()
         
-        # Clean up old requests
-        self.request_counts = {ip: [t for t in times if t > now - 60] 
-                              for ip, times in self.request_counts.items()}
+        # Drop this client's requests older than a minute. Timestamps are
+        # appended in order, so only the left end of its deque needs trimming.
+        cutoff = now - 60
+        times = self.request_counts.get(client_ip)
+        if times is None:
+            times = self.request_counts[client_ip] = deque()
+        while times and times[0] <= cutoff:
+            times.popleft()
         
         # Check if rate limit exceeded
-        if (client_ip in self.request_counts and 
-            len(self.request_counts[client_ip]) >= self.MAX_REQUESTS_PER_MINUTE):
+        if len(times) >= self.MAX_REQUESTS_PER_MINUTE:
             logger.warning('Rate limit exceeded for client %s', client_ip)
             return HttpResponse('Rate limit exceeded', status=429,
                               headers={'Retry-After': '60'})
                               
         # Add this request to the count
-        if client_ip not in self.request_counts:
-            self.request_counts[client_ip] = []
-        self.request_counts[client_ip].append(now)
+        times.append(now)
+        
+        # Forget idle clients once a minute rather than rebuilding the whole
+        # map on every request
+        if now - self._last_sweep > 60:
+            self.request_counts = {ip: t for ip, t in self.request_counts.items()
+                                   if t and t[-1] > cutoff}
+            self._last_sweep = now
         
         # Try to get from cache
         cached_tile = MapCache.get_tile(z, x, y)
@@ -127,9 +138,9 @@ class MapTileOptimizationMiddleware(MiddlewareMixin):
             # Add cache headers
             self._add_cache_headers(response, 60*60*24*7)  # 7 days
             
-            # Store in cache if not already there
-            if not MapCache.get_tile(z, x, y):
-                MapCache.set_tile(z, x, y, response.content)
+            # Store in cache if not already there (single atomic add instead
+            # of fetching the whole tile back just to check for it)
+            MapCache.add_tile(z, x, y, response.content)
                 
         return response
         
@@ -205,14 +216,17 @@ class VectorDataOptimizationMiddleware(MiddlewareMixin):
     
     # Pattern to match vector data URLs
     VECTOR_URL_PATTERN = re.compile(r'^/api/geo/(buildings|roads|parks)/$')
+    # Path whose requests get request/response logging
+    VECTOR_LOG_PATH = '/api/geo/buildings/'
     
     def __init__(self, get_response):
         self.get_response = get_response
         self.logger = logging.getLogger('bopmaps.geo.vector')
         
     def __call__(self, request):
-        # Only process vector data endpoints
-        if '/api/geo/buildings/' in request.path:
+        # Only process vector data endpoints; checked once and reused by the hooks
+        is_vector = request._is_vector_request = self.VECTOR_LOG_PATH in request.path
+        if is_vector and self.logger.isEnabledFor(logging.INFO):
             self.logger.info(
                 'Vector data request received - Path: %s, Method: %s, User: %s',
                 request.path,
@@ -227,7 +241,7 @@ class VectorDataOptimizationMiddleware(MiddlewareMixin):
         response = self.get_response(request)
 
         # Log response details for vector data endpoints
-        if '/api/geo/buildings/' in request.path:
+        if is_vector and self.logger.isEnabledFor(logging.INFO):
             self.logger.info(
                 'Vector data response sent - Status: %d, Size: %d bytes',
                 response.status_code,
@@ -243,7 +257,7 @@ class VectorDataOptimizationMiddleware(MiddlewareMixin):
 
     def process_view(self, request, view_func, view_args, view_kwargs):
         # Log view information for vector data endpoints
-        if '/api/geo/buildings/' in request.path:
+        if getattr(request, '_is_vector_request', False):
             self.logger.debug(
                 'Processing vector data view - View: %s, Args: %s, Kwargs: %s',
                 view_func.__name__ if hasattr(view_func, '__name__') else 'Unknown',
@@ -254,7 +268,7 @@ class VectorDataOptimizationMiddleware(MiddlewareMixin):
 
     def process_exception(self, request, exception):
         # Log any exceptions in vector data processing
-        if '/api/geo/buildings/' in request.path:
+        if getattr(request, '_is_vector_request', False):
             self.logger.error(
                 'Error processing vector data request - Path: %s, Error: %s',
                 request.path,
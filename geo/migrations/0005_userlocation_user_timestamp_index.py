@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("geo", "0004_cachedtile_cachestatistics_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="userlocation",
+            index=models.Index(
+                fields=["user", "-timestamp"],
+                name="userlocation_user_ts_idx",
+            ),
+        ),
+    ]
@@ -34,6 +34,10 @@ class UserLocation(models.Model):
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # Serves a user's history newest-first without a sort step
+            models.Index(fields=['user', '-timestamp'], name='userlocation_user_ts_idx'),
+        ]
         
     def __str__(self):
         return f"{self.user.username} at {self.timestamp}"
@@ -128,9 +132,15 @@ class CachedTile(models.Model):
         unique_together = ('z', 'x', 'y')
 
     def update_access(self):
-        self.last_accessed = timezone.now()
+        # Single UPDATE of the two touched columns; .update() bypasses
+        # auto_now, so last_accessed is set explicitly
+        now = timezone.now()
+        type(self).objects.filter(pk=self.pk).update(
+            last_accessed=now,
+            access_count=models.F('access_count') + 1
+        )
+        self.last_accessed = now
         self.access_count += 1
-        self.save()
 
 class CachedRegion(models.Model):
     """Model for tracking cached region bundles"""
@@ -154,9 +164,15 @@ class CachedRegion(models.Model):
         ]
 
     def update_access(self):
-        self.last_accessed = timezone.now()
+        # Single UPDATE of the two touched columns; .update() bypasses
+        # auto_now, so last_accessed is set explicitly
+        now = timezone.now()
+        type(self).objects.filter(pk=self.pk).update(
+            last_accessed=now,
+            access_count=models.F('access_count') + 1
+        )
+        self.last_accessed = now
         self.access_count += 1
-        self.save()
 
 class CacheStatistics(models.Model):
     """Model for tracking cache usage statistics"""
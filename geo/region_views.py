@@ -9,18 +9,23 @@ from django.contrib.gis.geos import Polygon
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
+from django.core.cache import cache
 
 from rest_framework import viewsets, status, mixins
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from celery import states
 from celery.result import AsyncResult
 
 from .models import CachedRegion
 from .serializers import CachedRegionSerializer
 from .tasks import create_region_bundle
 
+# How long a submitted bundle task is reused for identical requests
+BUNDLE_TASK_CACHE_TIMEOUT = 60 * 10
+
 class RegionViewSet(viewsets.ReadOnlyModelViewSet):
     """
     API for cached region management
@@ -68,6 +73,10 @@ class RegionViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
             
+        # Count the download as an access so bundles in use aren't expired by
+        # cleanup; a single F() UPDATE rather than a full-row save
+        region.update_access()
+        
         # Return the file
         try:
             return FileResponse(
@@ -123,6 +132,17 @@ class RegionBundleTaskView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
             
+        # Clients retry and refresh while a bundle builds; hand back the
+        # task still running for the same request instead of starting another.
+        # A finished task (failed, revoked or done) isn't reused, so a retry
+        # after a failure starts a fresh build.
+        cache_key = f"region_bundle:task:{north}:{south}:{east}:{west}:{min_zoom}:{max_zoom}:{name or ''}"
+        task_id = cache.get(cache_key)
+        if task_id:
+            if AsyncResult(task_id).state not in states.READY_STATES:
+                return Response({"task_id": task_id})
+            cache.delete(cache_key)
+            
         # Create bundle task
         task = create_region_bundle.delay(
             north=north,
@@ -134,6 +154,8 @@ class RegionBundleTaskView(APIView):
             name=name
         )
         
+        cache.set(cache_key, task.id, BUNDLE_TASK_CACHE_TIMEOUT)
+        
         # Return task ID for status polling
         return Response({"task_id": task.id})
     
@@ -124,7 +124,7 @@ class UserMapSettingsSerializer(serializers.ModelSerializer):
     """
     Serializer for UserMapSettings model
     """
-    username = serializers.SerializerMethodField()
+    username = serializers.CharField(source='user.username', read_only=True)
     
     class Meta:
         model = UserMapSettings
@@ -132,6 +132,3 @@ class UserMapSettingsSerializer(serializers.ModelSerializer):
                  'default_latitude', 'default_longitude', 'default_zoom',
                  'max_cache_size_mb', 'theme', 'updated_at')
         read_only_fields = ('id', 'user', 'username', 'updated_at')
-        
-    def get_username(self, obj):
-        return obj.user.username 
\ No newline at end of file
@@ -7,11 +7,12 @@ Celery tasks for geo data management including:
 
 import os
 import json
+import math
+import itertools
 import time
 import zipfile
 import tempfile
 import subprocess
-import requests
 import logging
 from io import BytesIO
 from datetime import datetime, timedelta
@@ -21,12 +22,22 @@ from django.core.files import File
 from django.utils import timezone
 from celery import shared_task
 from celery.result import AsyncResult
-from django.db.models import Sum
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from cache_system import MapCache
 
 from .models import Building, Road, Park, CachedRegion, CachedTile, CacheStatistics
+from .utils import osm_session
 
 logger = logging.getLogger('bopmaps')
 
+# Report bundle download progress every N tiles
+BUNDLE_PROGRESS_INTERVAL = 25
+
+# Maximum number of region bundles deleted by one cleanup subtask
+CLEANUP_BATCH_SIZE = 500
+
 @shared_task(bind=True)
 def create_region_bundle(self, north, south, east, west, min_zoom=10, max_zoom=18, name=None):
     """
@@ -40,6 +51,10 @@ def create_region_bundle(self, north, south, east, west, min_zoom=10, max_zoom=1
     Returns:
         ID of the created CachedRegion
     """
+    # Coerce the bounds once; they arrive from JSON task arguments
+    north, south, east, west = float(north), float(south), float(east), float(west)
+    min_zoom, max_zoom = int(min_zoom), int(max_zoom)
+    
     bundle_name = name or f"Region {north:.2f},{west:.2f} to {south:.2f},{east:.2f}"
     
     # Create a temporary directory for files
@@ -54,17 +69,17 @@ def create_region_bundle(self, north, south, east, west, min_zoom=10, max_zoom=1
         })
         
         # Create a polygon for the region bounds
-        bbox = (float(west), float(south), float(east), float(north))
+        bbox = (west, south, east, north)
         bounds = Polygon.from_bbox(bbox)
         
         # Calculate size estimate in tiles
         tile_count = 0
-        for z in range(int(min_zoom), int(max_zoom) + 1):
+        for z in range(min_zoom, max_zoom + 1):
             # Simple formula for tile count in a region
             # 2^z tiles cover the entire world
             # So we estimate our portion based on lat/lng coverage
-            lng_portion = (float(east) - float(west)) / 360.0
-            lat_portion = (float(north) - float(south)) / 180.0
+            lng_portion = (east - west) / 360.0
+            lat_portion = (north - south) / 180.0
             level_tiles = int((2 ** z) * (2 ** z) * lng_portion * lat_portion)
             tile_count += level_tiles
         
@@ -173,25 +188,23 @@ def create_region_bundle(self, north, south, east, west, min_zoom=10, max_zoom=1
             # Download tiles for each zoom level
             downloaded_tiles = 0
             
-            for z in range(int(min_zoom), int(max_zoom) + 1):
-                # Calculate tile coordinates for this zoom level
-                # Formula: https://wiki.openstreetmap.org/wiki/Slippy_map_tilenames
-                
-                # Helper functions
-                def lat_to_y(lat_deg, zoom):
-                    lat_rad = math.radians(lat_deg)
-                    n = 2.0 ** zoom
-                    return int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
-                
-                def lng_to_x(lng_deg, zoom):
-                    n = 2.0 ** zoom
-                    return int((lng_deg + 180.0) / 360.0 * n)
-                
-                # Calculate tile ranges
-                min_x = lng_to_x(float(west), z)
-                max_x = lng_to_x(float(east), z)
-                min_y = lat_to_y(float(north), z)
-                max_y = lat_to_y(float(south), z)
+            # Helper functions
+            # Formula: https://wiki.openstreetmap.org/wiki/Slippy_map_tilenames
+            def lat_to_y(lat_deg, zoom):
+                lat_rad = math.radians(lat_deg)
+                n = 2.0 ** zoom
+                return int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+            
+            def lng_to_x(lng_deg, zoom):
+                n = 2.0 ** zoom
+                return int((lng_deg + 180.0) / 360.0 * n)
+            
+            for z in range(min_zoom, max_zoom + 1):
+                # Calculate tile ranges for this zoom level
+                min_x = lng_to_x(west, z)
+                max_x = lng_to_x(east, z)
+                min_y = lat_to_y(north, z)
+                max_y = lat_to_y(south, z)
                 
                 # Ensure reasonable limits
                 tile_limit = 1000  # Maximum tiles per zoom level
@@ -210,20 +223,32 @@ def create_region_bundle(self, north, south, east, west, min_zoom=10, max_zoom=1
                 
                 # Download tiles
                 for x in range(min_x, max_x + 1):
+                    # Create directory structure (once per column, not per tile)
+                    tile_dir = os.path.join(tiles_dir, str(z), str(x))
+                    os.makedirs(tile_dir, exist_ok=True)
+                    
+                    # One cache round trip for the whole column
+                    cached_column = MapCache.get_tiles(z, x, range(min_y, max_y + 1))
+                    
                     for y in range(min_y, max_y + 1):
-                        # Create directory structure
-                        tile_dir = os.path.join(tiles_dir, str(z), str(x))
-                        os.makedirs(tile_dir, exist_ok=True)
-                        
                         # Check if already downloaded
                         tile_path = os.path.join(tile_dir, f"{y}.png")
                         if os.path.exists(tile_path):
                             continue
+                        
+                        # Fast path: reuse a tile the proxy already cached,
+                        # skipping the OSM request and the policy delay
+                        cached_tile = cached_column.get(y)
+                        if cached_tile:
+                            with open(tile_path, 'wb') as f:
+                                f.write(cached_tile)
+                            downloaded_tiles += 1
+                            continue
                             
                         # Download from tile server
                         tile_url = f"https://tile.openstreetmap.org/{z}/{x}/{y}.png"
                         try:
-                            response = requests.get(tile_url, timeout=5)
+                            response = osm_session.get(tile_url, timeout=5)
                             if response.status_code == 200:
                                 with open(tile_path, 'wb') as f:
                                     f.write(response.content)
@@ -237,8 +262,9 @@ def create_region_bundle(self, north, south, east, west, min_zoom=10, max_zoom=1
                             logger.error(f"Error downloading tile {z}/{x}/{y}: {e}")
                             # Continue despite errors
                             
-                        # Update progress based on total expected tiles
-                        if tile_count > 0:
+                        # Update progress based on total expected tiles. Each
+                        # update is a result-backend write, so batch them.
+                        if tile_count > 0 and downloaded_tiles and downloaded_tiles % BUNDLE_PROGRESS_INTERVAL == 0:
                             tile_progress = downloaded_tiles / tile_count
                             self.update_state(state='PROGRESS', meta={
                                 'progress': ((completed_tasks + tile_progress) / total_tasks) * 100,
@@ -264,12 +290,12 @@ def create_region_bundle(self, north, south, east, west, min_zoom=10, max_zoom=1
             # Create a metadata file
             metadata = {
                 'name': bundle_name,
-                'north': float(north),
-                'south': float(south),
-                'east': float(east),
-                'west': float(west),
-                'min_zoom': int(min_zoom),
-                'max_zoom': int(max_zoom),
+                'north': north,
+                'south': south,
+                'east': east,
+                'west': west,
+                'min_zoom': min_zoom,
+                'max_zoom': max_zoom,
                 'tile_count': downloaded_tiles,
                 'created_at': datetime.now().isoformat(),
                 'version': '1.0'
@@ -300,25 +326,23 @@ def create_region_bundle(self, north, south, east, west, min_zoom=10, max_zoom=1
                         rel_path = os.path.relpath(file_path, temp_dir)
                         zipf.write(file_path, rel_path)
                         
-            # Get file size
-            size_kb = os.path.getsize(zip_filename) // 1024
-            
-            # Create CachedRegion record
-            region = CachedRegion.objects.create(
+            # Build the CachedRegion record
+            region = CachedRegion(
                 name=bundle_name,
-                north=float(north),
-                south=float(south),
-                east=float(east),
-                west=float(west),
-                min_zoom=int(min_zoom),
-                max_zoom=int(max_zoom),
-                bounds=bounds,
-                size_kb=size_kb
+                north=north,
+                south=south,
+                east=east,
+                west=west,
+                min_zoom=min_zoom,
+                max_zoom=max_zoom,
+                size_bytes=os.path.getsize(zip_filename)
             )
             
-            # Attach bundle file
+            # Attach bundle file, then write the row once (an INSERT) rather
+            # than creating it and re-saving every column after the upload
             with open(zip_filename, 'rb') as f:
-                region.bundle_file.save(os.path.basename(zip_filename), File(f))
+                region.bundle_file.save(os.path.basename(zip_filename), File(f), save=False)
+            region.save()
                 
             # Clean up temp file
             if os.path.exists(zip_filename):
@@ -382,7 +406,7 @@ def import_osm_data(north, south, east, west):
         """
         
         try:
-            response = requests.post(overpass_url, data={"data": overpass_query})
+            response = osm_session.post(overpass_url, data={"data": overpass_query})
             if response.status_code != 200:
                 logger.error(f"Overpass API request failed: {response.status_code}")
                 return {
@@ -442,78 +466,188 @@ def import_osm_data(north, south, east, west):
                 "message": str(e)
             }
 
-@shared_task
-def cleanup_expired_data():
+def _start_cleanup_statistics():
     """
-    Periodic task to clean up expired cached data
+    Create the statistics row for one cleanup run
+    
+    The row starts with the current cache totals; the cleanup subtasks
+    then add what they removed to it, so each run leaves a single row.
+    
+    Returns:
+        int: ID of the CacheStatistics row for the run
     """
-    now = timezone.now()
-    stats = {
-        'tiles_cleaned': 0,
-        'regions_cleaned': 0,
-        'space_reclaimed': 0
-    }
+    # Row count and size of each table in one query per table
+    tile_totals = CachedTile.objects.aggregate(count=Count('id'), size=Sum('size_bytes'))
+    region_totals = CachedRegion.objects.aggregate(count=Count('id'), size=Sum('size_bytes'))
     
-    try:
-        # Clean up expired tiles
-        tile_expiry = now - timedelta(days=settings.TILE_CACHE_DAYS)
-        expired_tiles = CachedTile.objects.filter(last_accessed__lt=tile_expiry)
-        
-        # Get space to be reclaimed from tiles
-        space_from_tiles = expired_tiles.aggregate(Sum('size_bytes'))['size_bytes__sum'] or 0
-        tiles_count = expired_tiles.count()
-        expired_tiles.delete()
-        
-        stats['tiles_cleaned'] = tiles_count
-        stats['space_reclaimed'] += space_from_tiles
-        
-        # Clean up unused region bundles
-        region_expiry = now - timedelta(days=settings.REGION_CACHE_DAYS)
-        expired_regions = CachedRegion.objects.filter(last_accessed__lt=region_expiry)
+    stats = CacheStatistics.objects.create(
+        total_tiles=tile_totals['count'],
+        total_regions=region_totals['count'],
+        total_size_bytes=(tile_totals['size'] or 0) + (region_totals['size'] or 0),
+        cleanup_runs=1
+    )
+    return stats.id
+
+def _record_cleanup_statistics(stats_id, tiles_cleaned=0, regions_cleaned=0,
+                               space_reclaimed=0):
+    """
+    Add what one cleanup subtask removed to its run's statistics row
+    
+    Counters are updated with F() expressions, so subtasks finishing at the
+    same time don't overwrite each other. The totals are reduced by the same
+    amounts, so once every subtask has finished they reflect the cache after
+    cleanup without re-aggregating the tables.
+    
+    Args:
+        stats_id: ID of the run's CacheStatistics row, or None to start one
+        tiles_cleaned: Number of tiles removed
+        regions_cleaned: Number of regions removed
+        space_reclaimed: Bytes reclaimed
+    """
+    if stats_id is None:
+        stats_id = _start_cleanup_statistics()
+    
+    CacheStatistics.objects.filter(id=stats_id).update(
+        total_tiles=F('total_tiles') - tiles_cleaned,
+        total_regions=F('total_regions') - regions_cleaned,
+        total_size_bytes=F('total_size_bytes') - space_reclaimed,
+        tiles_cleaned=F('tiles_cleaned') + tiles_cleaned,
+        regions_cleaned=F('regions_cleaned') + regions_cleaned,
+        space_reclaimed_bytes=F('space_reclaimed_bytes') + space_reclaimed
+    )
+    
+    logger.info(
+        f"Cache cleanup step completed: {tiles_cleaned} tiles, "
+        f"{regions_cleaned} regions, {space_reclaimed} bytes reclaimed"
+    )
+
+@shared_task
+def cleanup_expired_tiles(stats_id=None):
+    """
+    Delete tiles that haven't been accessed within TILE_CACHE_DAYS
+    
+    Args:
+        stats_id: ID of the cleanup run's CacheStatistics row
         
-        # Get space to be reclaimed from regions
-        space_from_regions = expired_regions.aggregate(Sum('size_bytes'))['size_bytes__sum'] or 0
-        regions_count = expired_regions.count()
+    Returns:
+        dict: Number of tiles removed and bytes reclaimed
+    """
+    tile_expiry = timezone.now() - timedelta(days=settings.TILE_CACHE_DAYS)
+    expired_tiles = CachedTile.objects.filter(last_accessed__lt=tile_expiry)
+    
+    # Get space to be reclaimed from tiles; delete() reports the row count,
+    # so no separate COUNT query is needed
+    space_from_tiles = expired_tiles.aggregate(Sum('size_bytes'))['size_bytes__sum'] or 0
+    tiles_count, _ = expired_tiles.delete()
+    
+    _record_cleanup_statistics(
+        stats_id, tiles_cleaned=tiles_count, space_reclaimed=space_from_tiles
+    )
+    
+    return {'tiles_cleaned': tiles_count, 'space_reclaimed': space_from_tiles}
+
+def _delete_bundle_files(bundle_names):
+    """
+    Delete region bundle files from storage, logging any that fail
+    
+    Args:
+        bundle_names: Storage names of the bundle files
+    """
+    storage = CachedRegion._meta.get_field('bundle_file').storage
+    for bundle_name in bundle_names:
+        try:
+            storage.delete(bundle_name)
+        except Exception as e:
+            logger.error(f"Error deleting region bundle file {bundle_name}: {e}")
+
+@shared_task
+def cleanup_region_batch(region_ids, stats_id=None):
+    """
+    Delete a batch of expired region bundles and their files
+    
+    Args:
+        region_ids: IDs of regions that were expired when the batch was built
+        stats_id: ID of the cleanup run's CacheStatistics row
         
-        # Delete region bundle files and records
-        for region in expired_regions:
-            try:
-                region.bundle_file.delete()  # Delete the actual file
-            except Exception as e:
-                logger.error(f"Error deleting region bundle file: {e}")
-        expired_regions.delete()
+    Returns:
+        dict: Number of regions removed and bytes reclaimed
+    """
+    region_expiry = timezone.now() - timedelta(days=settings.REGION_CACHE_DAYS)
+    space_from_regions = 0
+    deleted_ids = []
+    bundle_names = []
+    
+    with transaction.atomic():
+        # Re-check expiry in case a region was accessed after the batch was
+        # queued, and skip rows another cleanup run already has locked
+        expired_regions = CachedRegion.objects.select_for_update(
+            skip_locked=True
+        ).filter(
+            id__in=region_ids, last_accessed__lt=region_expiry
+        ).values_list('id', 'bundle_file', 'size_bytes')
         
-        stats['regions_cleaned'] = regions_count
-        stats['space_reclaimed'] += space_from_regions
+        for region_id, bundle_name, size_bytes in expired_regions:
+            deleted_ids.append(region_id)
+            space_from_regions += size_bytes or 0
+            if bundle_name:
+                bundle_names.append(bundle_name)
+        CachedRegion.objects.filter(id__in=deleted_ids).delete()
         
-        # Record cleanup statistics
-        CacheStatistics.objects.create(
-            total_tiles=CachedTile.objects.count(),
-            total_regions=CachedRegion.objects.count(),
-            total_size_bytes=CachedTile.objects.aggregate(Sum('size_bytes'))['size_bytes__sum'] or 0 +
-                           CachedRegion.objects.aggregate(Sum('size_bytes'))['size_bytes__sum'] or 0,
-            cleanup_runs=1,
-            tiles_cleaned=stats['tiles_cleaned'],
-            regions_cleaned=stats['regions_cleaned'],
-            space_reclaimed_bytes=stats['space_reclaimed']
+        # Remove the files only once the rows are gone for good, so a
+        # rollback can't leave rows pointing at missing files and the row
+        # locks aren't held during storage I/O
+        transaction.on_commit(lambda: _delete_bundle_files(bundle_names))
+    
+    regions_count = len(deleted_ids)
+    _record_cleanup_statistics(
+        stats_id, regions_cleaned=regions_count, space_reclaimed=space_from_regions
+    )
+    
+    return {'regions_cleaned': regions_count, 'space_reclaimed': space_from_regions}
+
+@shared_task(ignore_result=True)
+def cleanup_expired_data():
+    """
+    Periodic task to clean up expired cached data
+    
+    Tile and region cleanup touch independent tables, so they run in
+    parallel. Region bundles are split into bounded batches so each worker
+    only holds one batch of rows and files, and a failed batch can be
+    retried on its own. The run gets one statistics row up front and each
+    subtask adds its counts to it, so nothing has to wait for the others to
+    finish.
+    """
+    try:
+        region_expiry = timezone.now() - timedelta(days=settings.REGION_CACHE_DAYS)
+        region_ids = (
+            CachedRegion.objects.filter(last_accessed__lt=region_expiry)
+            .values_list('id', flat=True)
+            .iterator(chunk_size=2000)
         )
         
-        logger.info(f"Cache cleanup completed: {stats}")
-        return stats
+        stats_id = _start_cleanup_statistics()
+        cleanup_expired_tiles.delay(stats_id)
         
+        # Enqueue each batch as soon as it is read so only one batch of ids
+        # is held in memory at a time
+        while True:
+            batch = list(itertools.islice(region_ids, CLEANUP_BATCH_SIZE))
+            if not batch:
+                break
+            cleanup_region_batch.delay(batch, stats_id)
     except Exception as e:
         logger.error(f"Error during cache cleanup: {e}")
         raise
 
-@shared_task
+@shared_task(ignore_result=True)
 def monitor_storage_usage():
     """
     Monitor storage usage and trigger cleanup if needed
     """
     try:
         total_size = (
-            CachedTile.objects.aggregate(Sum('size_bytes'))['size_bytes__sum'] or 0 +
-            CachedRegion.objects.aggregate(Sum('size_bytes'))['size_bytes__sum'] or 0
+            (CachedTile.objects.aggregate(Sum('size_bytes'))['size_bytes__sum'] or 0) +
+            (CachedRegion.objects.aggregate(Sum('size_bytes'))['size_bytes__sum'] or 0)
         )
         
         # If total size exceeds 90% of max allowed, trigger cleanup
@@ -531,18 +665,24 @@ def monitor_storage_usage():
         logger.error(f"Error monitoring storage usage: {e}")
         raise
 
-@shared_task
+@shared_task(ignore_result=True)
 def remove_least_accessed_tiles(count=1000):
     """
     Remove least accessed tiles when approaching storage limits
     """
     try:
-        tiles = CachedTile.objects.order_by('access_count', 'last_accessed')[:count]
+        # Select ids first: sliced querysets can't be deleted, and this avoids
+        # loading the tile blobs just to pick which rows to drop
+        tile_ids = list(
+            CachedTile.objects.order_by('access_count', 'last_accessed')
+            .values_list('id', flat=True)[:count]
+        )
+        tiles = CachedTile.objects.filter(id__in=tile_ids)
         space_reclaimed = tiles.aggregate(Sum('size_bytes'))['size_bytes__sum'] or 0
         tiles.delete()
         
-        logger.info(f"Removed {count} least accessed tiles, reclaimed {space_reclaimed} bytes")
-        return {'tiles_removed': count, 'space_reclaimed': space_reclaimed}
+        logger.info(f"Removed {len(tile_ids)} least accessed tiles, reclaimed {space_reclaimed} bytes")
+        return {'tiles_removed': len(tile_ids), 'space_reclaimed': space_reclaimed}
         
     except Exception as e:
         logger.error(f"Error removing least accessed tiles: {e}")
@@ -0,0 +1,15 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Shared keep-alive session for OpenStreetMap requests (tile fetches in the
+# tile proxy, bundle downloads and Overpass queries in the Celery tasks), so
+# each process reuses pooled TLS connections instead of opening new ones.
+# Transient 5xx responses and connection errors are retried with backoff.
+osm_session = requests.Session()
+osm_session.headers['User-Agent'] = 'BOPMaps/1.0 (+https://bopmaps.com)'  # Required by OSM
+osm_session.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=(502, 503, 504)),
+))
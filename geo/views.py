@@ -18,6 +18,7 @@ from .models import TrendingArea, UserLocation, Building, Road, Park, CachedRegi
 from .serializers import (TrendingAreaSerializer, UserLocationSerializer, 
                          BuildingSerializer, RoadSerializer, ParkSerializer,
                          CachedRegionSerializer, UserMapSettingsSerializer)
+from .utils import osm_session
 
 import logging
 import requests
@@ -425,27 +426,51 @@ class UserMapSettingsViewSet(viewsets.ModelViewSet):
         """
         Return only the current user's settings
         """
-        return UserMapSettings.objects.filter(user=self.request.user)
+        return UserMapSettings.objects.filter(user=self.request.user).select_related('user')
     
     def perform_create(self, serializer):
         """
         Ensure settings are associated with the current user
         """
         serializer.save(user=self.request.user)
+        MapCache.invalidate_user_settings(self.request.user.id)
+    
+    def perform_update(self, serializer):
+        """
+        Save settings and invalidate the cached copy
+        """
+        serializer.save()
+        MapCache.invalidate_user_settings(self.request.user.id)
+    
+    def perform_destroy(self, instance):
+        """
+        Delete settings and invalidate the cached copy
+        """
+        instance.delete()
+        MapCache.invalidate_user_settings(self.request.user.id)
     
     def retrieve(self, request, *args, **kwargs):
         """
         Get settings for the current user, creating default settings if none exist
         """
+        # Serve the serialized settings from cache when available
+        cached_data = MapCache.get_user_settings(request.user.id)
+        if cached_data is not None:
+            return Response(cached_data)
+        
         try:
-            settings = UserMapSettings.objects.get(user=request.user)
-            serializer = self.get_serializer(settings)
-            return Response(serializer.data)
+            settings = UserMapSettings.objects.select_related('user').get(user=request.user)
         except UserMapSettings.DoesNotExist:
-            # Create default settings
-            settings = UserMapSettings.objects.create(user=request.user)
-            serializer = self.get_serializer(settings)
-            return Response(serializer.data)
+            # Create default settings. INSERT ... ON CONFLICT DO NOTHING keeps
+            # concurrent first requests from failing on the one-to-one constraint.
+            UserMapSettings.objects.bulk_create(
+                [UserMapSettings(user=request.user)], ignore_conflicts=True
+            )
+            settings = UserMapSettings.objects.select_related('user').get(user=request.user)
+        
+        data = self.get_serializer(settings).data
+        MapCache.set_user_settings(request.user.id, data)
+        return Response(data)
     
     @action(detail=False, methods=['get'])
     def current(self, request):
@@ -470,6 +495,13 @@ class OSMTileView(APIView):
     BASE_TIMEOUT = 10
     MAX_ZOOM = 19  # OSM's max zoom level
     
+    # Circuit breaker: after repeated 429s, stop calling OSM for a while
+    FAILURE_KEY = "osm_tile:rate_limit_failures"
+    COOLDOWN_KEY = "osm_tile:cooldown"
+    FAILURE_THRESHOLD = 5
+    FAILURE_WINDOW = 60 * 5
+    COOLDOWN_SECONDS = 60 * 15
+    
     def get_authenticators(self):
         return []
     
@@ -501,6 +533,24 @@ class OSMTileView(APIView):
             'If-None-Match': None  # Will be set if we have an ETag
         }
     
+    def record_rate_limit(self):
+        """Count an OSM 429 and open the circuit once the threshold is hit"""
+        cache.add(self.FAILURE_KEY, 0, timeout=self.FAILURE_WINDOW)
+        try:
+            failures = cache.incr(self.FAILURE_KEY)
+        except ValueError:
+            # The counter expired or was reset between add() and incr()
+            cache.set(self.FAILURE_KEY, 1, timeout=self.FAILURE_WINDOW)
+            failures = 1
+        if failures >= self.FAILURE_THRESHOLD:
+            logger.warning(f"OSM rate limited {failures} times, pausing upstream requests for {self.COOLDOWN_SECONDS}s")
+            # Store when the cooldown ends so Retry-After can report the time left
+            cooldown_until = timezone.now().timestamp() + self.COOLDOWN_SECONDS
+            cache.set(self.COOLDOWN_KEY, cooldown_until, timeout=self.COOLDOWN_SECONDS)
+            cache.delete(self.FAILURE_KEY)
+            return True
+        return False
+    
     def add_response_headers(self, response, source="cache"):
         """Add standard response headers"""
         response["Access-Control-Allow-Origin"] = "*"
@@ -530,7 +580,7 @@ class OSMTileView(APIView):
         cached_data = MapCache.get_tile(z, x, y)
         # Get ETag directly from the cache to ensure we're using the right key
         cached_etag = cache.get(f"{osm_tile_key}:metadata:etag")
-        logger.info(f"Cached ETag from database: '{cached_etag}'")
+        logger.debug("Cached ETag from cache: '%s'", cached_etag)
         
         # Handle conditional requests with If-None-Match header
         if cached_etag and 'HTTP_IF_NONE_MATCH' in request.META:
@@ -540,23 +590,22 @@ class OSMTileView(APIView):
             client_etag_clean = client_etag.replace('"', '')
             cached_etag_clean = cached_etag.replace('"', '')
             
-            logger.info(f"HTTP_IF_NONE_MATCH: '{request.META['HTTP_IF_NONE_MATCH']}'")
-            logger.info(f"Normalized ETags - Client: '{client_etag_clean}' vs Cached: '{cached_etag_clean}'")
+            logger.debug("Normalized ETags - Client: '%s' vs Cached: '%s'", client_etag_clean, cached_etag_clean)
             
             # Compare the ETags after normalization
             if client_etag_clean == cached_etag_clean:
                 # Return 304 Not Modified with appropriate headers
-                logger.info(f"Returning 304 Not Modified for tile z={z}, x={x}, y={y}")
+                logger.debug("Returning 304 Not Modified for tile z=%s, x=%s, y=%s", z, x, y)
                 response = HttpResponse(status=304)
                 self.add_response_headers(response, source="cache")
                 response["ETag"] = client_etag  # Use the client's format for consistency
                 return response
             else:
-                logger.info(f"ETag mismatch for tile z={z}, x={x}, y={y}")
+                logger.debug("ETag mismatch for tile z=%s, x=%s, y=%s", z, x, y)
         elif 'HTTP_IF_NONE_MATCH' in request.META:
-            logger.info(f"If-None-Match header present, but no cached ETag: {request.META['HTTP_IF_NONE_MATCH']}")
+            logger.debug("If-None-Match header present, but no cached ETag: %s", request.META['HTTP_IF_NONE_MATCH'])
         elif cached_etag:
-            logger.info(f"Cached ETag present, but no If-None-Match header: {cached_etag}")
+            logger.debug("Cached ETag present, but no If-None-Match header: %s", cached_etag)
         
         if cached_data:
             response = HttpResponse(cached_data, content_type="image/png")
@@ -565,6 +614,14 @@ class OSMTileView(APIView):
                 response["ETag"] = cached_etag
             return response
         
+        # Don't hit OSM while the circuit breaker is open
+        cooldown_until = cache.get(self.COOLDOWN_KEY)
+        if cooldown_until:
+            retry_after = max(1, int(cooldown_until - timezone.now().timestamp()))
+            response = HttpResponse(status=503, content="Tile server temporarily unavailable")
+            response["Retry-After"] = str(retry_after)
+            return response
+        
         # Prepare headers for OSM request
         headers = self.get_osm_headers()
         if cached_etag:
@@ -576,7 +633,7 @@ class OSMTileView(APIView):
         for attempt in range(self.MAX_RETRIES):
             try:
                 current_timeout = self.BASE_TIMEOUT * (attempt + 1)  # Progressive timeout
-                response = requests.get(
+                response = osm_session.get(
                     osm_url,
                     headers=headers,
                     stream=True,
@@ -585,11 +642,11 @@ class OSMTileView(APIView):
                 
                 if response.status_code == 200:
                     # Store in cache with metadata
-                    logger.info(f"Response headers: {response.headers}")
+                    logger.debug("Response headers: %s", response.headers)
                     MapCache.set_tile(z, x, y, response.content)
                     if 'ETag' in response.headers:
                         etag_value = response.headers['ETag']
-                        logger.info(f"Storing ETag: {etag_value} for z={z}, x={x}, y={y}")
+                        logger.debug("Storing ETag: %s for z=%s, x=%s, y=%s", etag_value, z, x, y)
                         # Store the ETag directly using the actual tile coordinates
                         etag_cache_key = f"osm_tile:{z}:{x}:{y}"
                         # We store the ETag as-is to ensure we can properly handle it
@@ -621,12 +678,14 @@ class OSMTileView(APIView):
                     return HttpResponse(status=404)
                 
                 elif response.status_code == 429:
+                    # Don't sleep and retry on the serving worker: that blocks
+                    # the thread for seconds and retrying a rate limiter right
+                    # away rarely helps. Pass the back-off on to the client.
                     logger.warning(f"OSM rate limit exceeded (attempt {attempt + 1}): z={z}, x={x}, y={y}")
-                    if attempt < self.MAX_RETRIES - 1:
-                        import time
-                        time.sleep(2 ** attempt)  # Exponential backoff
-                        continue
-                    return HttpResponse(status=429, content="Rate limit exceeded")
+                    self.record_rate_limit()
+                    rate_limited = HttpResponse(status=429, content="Rate limit exceeded")
+                    rate_limited["Retry-After"] = response.headers.get('Retry-After', '60')
+                    return rate_limited
                 
                 else:
                     logger.warning(f"OSM tile request failed with status {response.status_code}: z={z}, x={x}, y={y}")
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("music", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="recenttrack",
+            index=models.Index(
+                fields=["user", "service", "track_id"],
+                name="recenttrack_user_svc_track_idx",
+            ),
+        ),
+    ]
@@ -59,6 +59,10 @@ class RecentTrack(models.Model):
     
     class Meta:
         ordering = ['-played_at']
+        indexes = [
+            # Covers the per-user track lookup when syncing recently played
+            models.Index(fields=['user', 'service', 'track_id'], name='recenttrack_user_svc_track_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.artist} (played by {self.user.username})"
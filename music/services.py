@@ -5,10 +5,20 @@ import base64
 import requests
 from datetime import timedelta
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from django.urls import reverse
 from django.utils import timezone
 import urllib.parse
 
+# Shared keep-alive session for Spotify, so token and API calls reuse pooled
+# TLS connections instead of opening a new one per request
+spotify_session = requests.Session()
+spotify_session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=20))
+
+# Seconds to wait on Spotify before giving up
+SPOTIFY_TIMEOUT = 10
+
 # Base classes for music service integrations
 class MusicServiceAuthMixin:
     """Base mixin for music service authentication"""
@@ -32,16 +42,26 @@ class MusicServiceAuthMixin:
         
         expires_at = timezone.now() + timedelta(seconds=tokens_data.get('expires_in', 3600))
         
-        # Update existing or create new
-        music_service, created = MusicService.objects.update_or_create(
+        # Update existing or create new in a single INSERT ... ON CONFLICT DO UPDATE
+        music_service = MusicService(
             user=user,
             service_type=service_type,
-            defaults={
-                'access_token': tokens_data.get('access_token'),
-                'refresh_token': tokens_data.get('refresh_token', ''),
-                'expires_at': expires_at
-            }
+            access_token=tokens_data.get('access_token'),
+            refresh_token=tokens_data.get('refresh_token', ''),
+            expires_at=expires_at
         )
+        MusicService.objects.bulk_create(
+            [music_service],
+            update_conflicts=True,
+            unique_fields=['user', 'service_type'],
+            update_fields=['access_token', 'refresh_token', 'expires_at']
+        )
+        if service_type == 'spotify':
+            # A reconnect may be a different Spotify account; clear the cache
+            # once the tokens are committed, off the request path
+            from .tasks import invalidate_spotify_cache  # Import here to avoid circular imports
+            user_id = user.id
+            transaction.on_commit(lambda: invalidate_spotify_cache.delay(user_id))
         return music_service
 
 # Spotify Integration
@@ -50,11 +70,13 @@ class SpotifyService:
     AUTHORIZATION_URL = "https://accounts.spotify.com/authorize"
     TOKEN_URL = "https://accounts.spotify.com/api/token"
     API_BASE_URL = "https://api.spotify.com/v1"
+    TRACK_CACHE_TIMEOUT = 60 * 60  # Track metadata rarely changes
+    PLAYLISTS_CACHE_TIMEOUT = 60 * 5  # Short TTL, user playlists can change
     
     @staticmethod
-    def get_auth_url(request):
+    def get_auth_url(request, redirect_uri=None):
         """Generate Spotify authorization URL"""
-        redirect_uri = MusicServiceAuthMixin.get_redirect_uri(request, 'spotify')
+        redirect_uri = redirect_uri or MusicServiceAuthMixin.get_redirect_uri(request, 'spotify')
         
         params = {
             'client_id': settings.SPOTIFY_CLIENT_ID,
@@ -66,9 +88,9 @@ class SpotifyService:
         return f"{SpotifyService.AUTHORIZATION_URL}?{urllib.parse.urlencode(params)}"
     
     @staticmethod
-    def exchange_code_for_tokens(request, code):
+    def exchange_code_for_tokens(request, code, redirect_uri=None):
         """Exchange authorization code for tokens"""
-        redirect_uri = MusicServiceAuthMixin.get_redirect_uri(request, 'spotify')
+        redirect_uri = redirect_uri or MusicServiceAuthMixin.get_redirect_uri(request, 'spotify')
         
         # Prepare auth header
         auth_header = base64.b64encode(
@@ -86,7 +108,7 @@ class SpotifyService:
             'redirect_uri': redirect_uri
         }
         
-        response = requests.post(SpotifyService.TOKEN_URL, headers=headers, data=data)
+        response = spotify_session.post(SpotifyService.TOKEN_URL, headers=headers, data=data, timeout=SPOTIFY_TIMEOUT)
         return response.json()
     
     @staticmethod
@@ -107,7 +129,7 @@ class SpotifyService:
             'refresh_token': music_service.refresh_token
         }
         
-        response = requests.post(SpotifyService.TOKEN_URL, headers=headers, data=data)
+        response = spotify_session.post(SpotifyService.TOKEN_URL, headers=headers, data=data, timeout=SPOTIFY_TIMEOUT)
         if response.status_code == 200:
             tokens_data = response.json()
             # Update token data
@@ -115,7 +137,7 @@ class SpotifyService:
             if 'refresh_token' in tokens_data:
                 music_service.refresh_token = tokens_data['refresh_token']
             music_service.expires_at = timezone.now() + timedelta(seconds=tokens_data.get('expires_in', 3600))
-            music_service.save()
+            music_service.save(update_fields=['access_token', 'refresh_token', 'expires_at'])
             return True
         return False
     
@@ -135,15 +157,15 @@ class SpotifyService:
         url = f"{SpotifyService.API_BASE_URL}/{endpoint}"
         
         if method == 'GET':
-            response = requests.get(url, headers=headers)
+            response = spotify_session.get(url, headers=headers, timeout=SPOTIFY_TIMEOUT)
         elif method == 'POST':
             headers['Content-Type'] = 'application/json'
-            response = requests.post(url, headers=headers, json=data)
+            response = spotify_session.post(url, headers=headers, json=data, timeout=SPOTIFY_TIMEOUT)
         elif method == 'PUT':
             headers['Content-Type'] = 'application/json'
-            response = requests.put(url, headers=headers, json=data)
+            response = spotify_session.put(url, headers=headers, json=data, timeout=SPOTIFY_TIMEOUT)
         elif method == 'DELETE':
-            response = requests.delete(url, headers=headers)
+            response = spotify_session.delete(url, headers=headers, timeout=SPOTIFY_TIMEOUT)
         else:
             return {'error': 'Invalid method'}
             
@@ -154,11 +176,27 @@ class SpotifyService:
     
     @staticmethod
     def get_user_playlists(music_service, limit=50, offset=0):
-        """Get user's playlists"""
-        return SpotifyService.make_api_request(
+        """Get user's playlists (cached briefly per user and page)"""
+        cache_key = f"spotify:playlists:{music_service.user_id}:{limit}:{offset}"
+        playlists = cache.get(cache_key)
+        if playlists is not None:
+            return playlists
+        
+        playlists = SpotifyService.make_api_request(
             music_service, 
             f"me/playlists?limit={limit}&offset={offset}"
         )
+        if 'error' not in playlists:
+            cache.set(cache_key, playlists, timeout=SpotifyService.PLAYLISTS_CACHE_TIMEOUT)
+        return playlists
+    
+    @staticmethod
+    def invalidate_user_cache(user_id):
+        """Drop cached per-user Spotify responses (on connect/disconnect)"""
+        # delete_pattern is django-redis only; other backends (e.g. the
+        # DummyCache in test settings) have nothing to invalidate by pattern
+        if hasattr(cache, 'delete_pattern'):
+            cache.delete_pattern(f"spotify:playlists:{user_id}:*")
     
     @staticmethod
     def get_playlist(music_service, playlist_id):
@@ -175,8 +213,16 @@ class SpotifyService:
     
     @staticmethod
     def get_track(music_service, track_id):
-        """Get details for a specific track"""
-        return SpotifyService.make_api_request(music_service, f"tracks/{track_id}")
+        """Get details for a specific track (cached, since it isn't user-specific)"""
+        cache_key = f"spotify:track:{track_id}"
+        track = cache.get(cache_key)
+        if track is not None:
+            return track
+        
+        track = SpotifyService.make_api_request(music_service, f"tracks/{track_id}")
+        if 'error' not in track:
+            cache.set(cache_key, track, timeout=SpotifyService.TRACK_CACHE_TIMEOUT)
+        return track
     
     @staticmethod
     def get_recently_played(music_service, limit=50):
@@ -0,0 +1,69 @@
+"""
+Celery tasks for music data that doesn't need to block a request
+"""
+
+import logging
+from datetime import datetime
+from django.db import transaction
+from celery import shared_task
+
+from .models import RecentTrack
+from .services import SpotifyService
+
+logger = logging.getLogger('bopmaps')
+
+@shared_task(ignore_result=True, acks_late=True, reject_on_worker_lost=True)
+def save_recent_tracks(user_id, tracks):
+    """
+    Upsert recently played Spotify tracks in bulk
+    (one SELECT, one INSERT and one UPDATE instead of a round trip per track)
+    
+    Args:
+        user_id: ID of the user the tracks were played by
+        tracks: Dict of Spotify track ID -> track fields, with played_at as
+            the ISO timestamp returned by Spotify
+    """
+    update_fields = ['title', 'artist', 'album', 'album_art', 'played_at']
+    
+    for values in tracks.values():
+        values['played_at'] = datetime.strptime(values['played_at'], "%Y-%m-%dT%H:%M:%S.%fZ")
+    
+    try:
+        with transaction.atomic():
+            existing = {
+                recent.track_id: recent
+                for recent in RecentTrack.objects.filter(
+                    user_id=user_id, service='spotify', track_id__in=list(tracks)
+                )
+            }
+            
+            to_create = []
+            to_update = []
+            for track_id, values in tracks.items():
+                recent = existing.get(track_id)
+                if recent is None:
+                    to_create.append(RecentTrack(user_id=user_id, track_id=track_id, service='spotify', **values))
+                else:
+                    for field, value in values.items():
+                        setattr(recent, field, value)
+                    to_update.append(recent)
+            
+            if to_create:
+                RecentTrack.objects.bulk_create(to_create, batch_size=500)
+            if to_update:
+                RecentTrack.objects.bulk_update(to_update, update_fields, batch_size=500)
+                
+    except Exception as e:
+        logger.error(f"Error saving recent tracks for user {user_id}: {str(e)}")
+        raise
+
+@shared_task(ignore_result=True, acks_late=True, reject_on_worker_lost=True)
+def invalidate_spotify_cache(user_id):
+    """
+    Drop a user's cached Spotify responses outside the request
+    (the pattern delete scans the cache keyspace)
+    
+    Args:
+        user_id: ID of the user whose cache entries are dropped
+    """
+    SpotifyService.invalidate_user_cache(user_id)
@@ -13,6 +13,14 @@ def get_user_music_services(user):
     services = MusicService.objects.filter(user=user)
     return {service.service_type: service for service in services}
 
+def get_user_music_service(user, service_type):
+    """
+    Get a single connected music service for a user
+    
+    Returns the MusicService object, or None if that service isn't connected
+    """
+    return MusicService.objects.filter(user=user, service_type=service_type).first()
+
 def search_music(user, query, service_type=None, limit=10):
     """
     Search for music across all connected services or a specific service
@@ -150,14 +158,15 @@ def get_playlist_tracks(user, playlist_id, service_type, limit=50):
     Returns:
         list of track results or None if error
     """
-    services = get_user_music_services(user)
+    # Only the requested service is needed; don't load every connection
+    music_service = get_user_music_service(user, service_type)
     
-    if service_type not in services:
+    if music_service is None:
         return None
     
     # Get Spotify playlist tracks
     if service_type == 'spotify':
-        spotify_results = SpotifyService.get_playlist_tracks(services['spotify'], playlist_id, limit)
+        spotify_results = SpotifyService.get_playlist_tracks(music_service, playlist_id, limit)
         if 'error' not in spotify_results and 'items' in spotify_results:
             # Format the results
             return [
@@ -189,14 +198,15 @@ def get_track_details(user, track_id, service_type):
     Returns:
         dict with track details or None if error
     """
-    services = get_user_music_services(user)
+    # Only the requested service is needed; don't load every connection
+    music_service = get_user_music_service(user, service_type)
     
-    if service_type not in services:
+    if music_service is None:
         return None
     
     # Get Spotify track details
     if service_type == 'spotify':
-        spotify_results = SpotifyService.get_track(services['spotify'], track_id)
+        spotify_results = SpotifyService.get_track(music_service, track_id)
         if 'error' not in spotify_results:
             # Format the result
             return {
@@ -4,6 +4,7 @@ from django.http import JsonResponse
 from django.utils import timezone
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse
+from django.db import transaction, IntegrityError
 from django.views.decorators.http import require_http_methods
 from rest_framework import viewsets, status, serializers
 from rest_framework.decorators import action, api_view, permission_classes
@@ -15,12 +16,13 @@ from django.shortcuts import redirect
 import requests
 import json
 import logging
-from datetime import datetime, timedelta
+from datetime import timedelta
 import uuid
 import string
 import random
 
-from .models import MusicService, RecentTrack
+from .models import MusicService
+from .tasks import save_recent_tracks, invalidate_spotify_cache
 from .services import MusicServiceAuthMixin, SpotifyService
 from .utils import (
     search_music, 
@@ -34,6 +36,9 @@ from .utils import (
 User = get_user_model()
 logger = logging.getLogger('bopmaps')
 
+# Token lifetime used to approximate when a service was connected
+TOKEN_LIFETIME = timedelta(hours=1)
+
 # First define all serializers
 class SpotifyAuthSerializer(serializers.Serializer):
     """Serializer for Spotify auth endpoints"""
@@ -101,13 +106,10 @@ def spotify_auth(request):
 @permission_classes([IsAuthenticated])
 def spotify_mobile_auth(request):
     """Start Spotify OAuth flow for mobile apps"""
-    # Create a mock request to pass to get_auth_url with mobile redirect URI
-    class MockRequest:
-        def __init__(self):
-            self.build_absolute_uri = lambda x: settings.SPOTIFY_MOBILE_REDIRECT_URI
-    
-    mock_request = MockRequest()
-    auth_url = SpotifyService.get_auth_url(mock_request)
+    # Pass the mobile redirect URI explicitly
+    auth_url = SpotifyService.get_auth_url(
+        request, redirect_uri=settings.SPOTIFY_MOBILE_REDIRECT_URI
+    )
     
     # Use the serializer for response
     serializer = SpotifyAuthSerializer({"auth_url": auth_url})
@@ -133,26 +135,27 @@ def spotify_callback(request):
     if 'error' in tokens_data:
         return JsonResponse({'error': tokens_data['error']})
     
-    # Create a temporary MusicService object to make API requests
-    temp_service = MusicService(
-        user=None,  # No user assigned yet
-        service_type='spotify',
-        access_token=tokens_data.get('access_token'),
-        refresh_token=tokens_data.get('refresh_token', ''),
-        expires_at=timezone.now() + timedelta(seconds=tokens_data.get('expires_in', 3600))
-    )
-    
-    # Get user profile from Spotify
-    user_profile = SpotifyService.make_api_request(temp_service, 'me')
-    
-    if 'error' in user_profile:
-        return JsonResponse({'error': f"Failed to get Spotify profile: {user_profile['error']}"})
-    
     # Check if we have a logged-in user
     if request.user.is_authenticated:
-        # User is already logged in, just connect the service
+        # User is already logged in, just connect the service. The Spotify
+        # profile is only needed to find or create an account, so skip it.
         user = request.user
     else:
+        # Create a temporary MusicService object to make API requests
+        temp_service = MusicService(
+            user=None,  # No user assigned yet
+            service_type='spotify',
+            access_token=tokens_data.get('access_token'),
+            refresh_token=tokens_data.get('refresh_token', ''),
+            expires_at=timezone.now() + timedelta(seconds=tokens_data.get('expires_in', 3600))
+        )
+        
+        # Get user profile from Spotify
+        user_profile = SpotifyService.make_api_request(temp_service, 'me')
+        
+        if 'error' in user_profile:
+            return JsonResponse({'error': f"Failed to get Spotify profile: {user_profile['error']}"})
+        
         # No logged-in user, check if a user with this email exists
         spotify_email = user_profile.get('email')
         
@@ -176,13 +179,6 @@ def spotify_callback(request):
                 # Remove spaces and special characters, and make it lowercase
                 base_username = ''.join(e for e in display_name if e.isalnum()).lower()
                 
-                # Check if username exists, if so, add random numbers
-                if User.objects.filter(username=base_username).exists():
-                    random_suffix = ''.join(random.choices(string.digits, k=4))
-                    username = f"{base_username}_{random_suffix}"
-                else:
-                    username = base_username
-                
                 # Create the user with a random password
                 random_password = ''.join(random.choices(string.ascii_letters + string.digits, k=16))
                 
@@ -191,17 +187,6 @@ def spotify_callback(request):
                 if user_profile.get('images') and len(user_profile['images']) > 0:
                     profile_pic_url = user_profile['images'][0].get('url')
                 
-                # Create user
-                user = User.objects.create_user(
-                    username=username,
-                    email=spotify_email,
-                    password=random_password,
-                    # Don't set profile_pic here as it's a URL, not a file
-                )
-                
-                # Set additional fields
-                user.spotify_connected = True
-                
                 # Add Spotify profile info to user bio if available
                 bio_parts = []
                 if display_name:
@@ -212,10 +197,24 @@ def spotify_callback(request):
                     product = user_profile.get('product').capitalize()
                     bio_parts.append(f"Spotify: {product}")
                 
-                if bio_parts:
-                    user.bio = " | ".join(bio_parts)
-                
-                user.save()
+                # Create user with all fields set up front (a single INSERT).
+                # Let the unique constraint on username detect a clash instead
+                # of checking first; on conflict, retry with random numbers.
+                user_fields = {
+                    'email': spotify_email,
+                    'password': random_password,
+                    'spotify_connected': True,
+                    'bio': " | ".join(bio_parts) if bio_parts else None,
+                    # Don't set profile_pic here as it's a URL, not a file
+                }
+                username = base_username
+                try:
+                    with transaction.atomic():
+                        user = User.objects.create_user(username=username, **user_fields)
+                except IntegrityError:
+                    random_suffix = ''.join(random.choices(string.digits, k=4))
+                    username = f"{base_username}_{random_suffix}"
+                    user = User.objects.create_user(username=username, **user_fields)
                 
                 # Auto-login the user
                 login(request, user)
@@ -225,8 +224,9 @@ def spotify_callback(request):
                 return JsonResponse({'error': f"Failed to create user: {str(e)}"})
     
     # Save Spotify tokens to user's account
-    user.spotify_connected = True
-    user.save()
+    if not user.spotify_connected:
+        user.spotify_connected = True
+        user.save(update_fields=['spotify_connected'])
     MusicServiceAuthMixin.save_tokens(user, 'spotify', tokens_data)
     
     # Redirect to success page or frontend app
@@ -250,45 +250,22 @@ def callback_handler(request):
         # Get data from request
         code = serializer.validated_data.get('code')
         
-        # Create a mock request to pass to exchange_code_for_tokens
-        class MockRequest:
-            def __init__(self):
-                self.build_absolute_uri = lambda x: settings.SPOTIFY_MOBILE_REDIRECT_URI
-        
-        mock_request = MockRequest()
-        
-        # Exchange code for tokens
-        tokens_data = SpotifyService.exchange_code_for_tokens(mock_request, code)
+        # Exchange code for tokens (the code was issued for the mobile redirect URI)
+        tokens_data = SpotifyService.exchange_code_for_tokens(
+            request, code, redirect_uri=settings.SPOTIFY_MOBILE_REDIRECT_URI
+        )
         
         if 'error' in tokens_data:
             logger.error(f"Error exchanging Spotify code: {tokens_data['error']}")
             return Response({'error': tokens_data['error']}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create a temporary MusicService object to make API requests
-        temp_service = MusicService(
-            user=None,  # No user assigned yet
-            service_type='spotify',
-            access_token=tokens_data.get('access_token'),
-            refresh_token=tokens_data.get('refresh_token', ''),
-            expires_at=timezone.now() + timedelta(seconds=tokens_data.get('expires_in', 3600))
-        )
-        
-        # Get user profile from Spotify
-        user_profile = SpotifyService.make_api_request(temp_service, 'me')
-        
-        if 'error' in user_profile:
-            logger.error(f"Error getting Spotify profile: {user_profile['error']}")
-            return Response(
-                {'error': f"Failed to get Spotify profile: {user_profile['error']}"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
         # Use the authenticated user
         user = request.user
         
         # Save Spotify tokens to user's account
-        user.spotify_connected = True
-        user.save()
+        if not user.spotify_connected:
+            user.spotify_connected = True
+            user.save(update_fields=['spotify_connected'])
         service = MusicServiceAuthMixin.save_tokens(user, 'spotify', tokens_data)
         
         # Use the response serializer
@@ -329,10 +306,13 @@ class MusicServiceViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['GET'])
     def connected_services(self, request):
         """Get user's connected music services"""
-        services = MusicService.objects.filter(user=request.user)
+        services = MusicService.objects.filter(user_id=request.user.id).only(
+            'service_type', 'expires_at'
+        )
+        now = timezone.now()
         data = [{'service_type': service.service_type, 
-                 'connected_at': service.expires_at - timedelta(hours=1),  # Approximate connection time
-                 'is_active': service.expires_at > timezone.now()
+                 'connected_at': service.expires_at - TOKEN_LIFETIME,  # Approximate connection time
+                 'is_active': service.expires_at > now
                 } for service in services]
         
         # Use the serializer
@@ -348,15 +328,18 @@ class MusicServiceViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        try:
-            service = MusicService.objects.get(user=request.user, service_type=service_type)
-            service.delete()
-            return Response({"message": f"{service_type} disconnected successfully"})
-        except MusicService.DoesNotExist:
+        # Delete directly instead of loading the row (and its tokens) first
+        deleted, _ = MusicService.objects.filter(
+            user_id=request.user.id, service_type=service_type
+        ).delete()
+        if not deleted:
             return Response(
                 {"error": f"No {service_type} connection found"}, 
                 status=status.HTTP_404_NOT_FOUND
             )
+        if service_type == 'spotify':
+            invalidate_spotify_cache.delay(request.user.id)
+        return Response({"message": f"{service_type} disconnected successfully"})
 
 
 class SpotifyViewSet(viewsets.ViewSet):
@@ -369,7 +352,7 @@ class SpotifyViewSet(viewsets.ViewSet):
     def _get_spotify_service(self):
         """Get the user's Spotify service or return None"""
         try:
-            return MusicService.objects.get(user=self.request.user, service_type='spotify')
+            return MusicService.objects.get(user_id=self.request.user.id, service_type='spotify')
         except MusicService.DoesNotExist:
             return None
     
@@ -446,23 +429,34 @@ class SpotifyViewSet(viewsets.ViewSet):
         
         # Optionally save to RecentTrack model
         if 'items' in result:
-            for item in result['items']:
-                track = item['track']
-                RecentTrack.objects.update_or_create(
-                    user=request.user,
-                    track_id=track['id'],
-                    service='spotify',
-                    defaults={
-                        'title': track['name'],
-                        'artist': track['artists'][0]['name'],
-                        'album': track['album']['name'],
-                        'album_art': track['album']['images'][0]['url'] if track['album']['images'] else None,
-                        'played_at': datetime.strptime(item['played_at'], "%Y-%m-%dT%H:%M:%S.%fZ")
-                    }
-                )
+            self._save_recent_tracks(request.user, result['items'])
         
         return Response(result)
     
+    def _save_recent_tracks(self, user, items):
+        """
+        Queue an upsert of recently played Spotify tracks, so the response
+        doesn't wait on the database writes
+        """
+        # Later items win, matching the previous per-item update_or_create order
+        tracks = {}
+        for item in items:
+            track = item['track']
+            tracks[track['id']] = {
+                'title': track['name'],
+                'artist': track['artists'][0]['name'],
+                'album': track['album']['name'],
+                'album_art': track['album']['images'][0]['url'] if track['album']['images'] else None,
+                'played_at': item['played_at']
+            }
+        
+        # Saving history is best effort; a broker outage shouldn't fail the
+        # recently-played response
+        try:
+            save_recent_tracks.delay(user.id, tracks)
+        except Exception as e:
+            logger.error(f"Error queueing recent tracks for user {user.id}: {str(e)}")
+    
     @action(detail=False, methods=['GET'])
     def search(self, request):
         """Search for tracks on Spotify"""
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pins", "0003_pinanalytics_pin_genre_pin_mood_pin_tags_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="pin",
+            index=models.Index(
+                condition=models.Q(("expiration_date__isnull", False)),
+                fields=["expiration_date"],
+                name="pin_expiration_partial_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="pin",
+            index=models.Index(
+                condition=models.Q(("is_private", False)),
+                fields=["-created_at"],
+                name="pin_public_created_idx",
+            ),
+        ),
+    ]
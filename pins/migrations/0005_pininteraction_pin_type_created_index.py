@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pins", "0004_pin_partial_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="pininteraction",
+            index=models.Index(
+                fields=["pin", "interaction_type", "created_at"],
+                name="pininteraction_pin_type_ts_idx",
+            ),
+        ),
+    ]
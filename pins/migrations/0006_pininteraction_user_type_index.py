@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pins", "0005_pininteraction_pin_type_created_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="pininteraction",
+            index=models.Index(
+                fields=["user", "interaction_type"],
+                name="pininteraction_user_type_idx",
+            ),
+        ),
+    ]
@@ -1,9 +1,49 @@
 from django.db import models
 from django.contrib.gis.db import models as gis_models
 from django.conf import settings
+from django.utils import timezone
 from django.utils.functional import cached_property
 from django.contrib.postgres.fields import ArrayField
 
+class PinQuerySet(models.QuerySet):
+    """
+    Reusable SQL filters for pins
+    """
+    def active(self):
+        """Pins that have no expiration date or haven't expired yet"""
+        return self.filter(
+            models.Q(expiration_date__isnull=True) |
+            models.Q(expiration_date__gt=timezone.now())
+        )
+    
+    def with_interaction_counts(self):
+        """
+        Annotate like_count and collect_count in the same query; the
+        annotations take the place of the per-pin Pin properties
+        """
+        return self.annotate(
+            like_count=models.Count(
+                'interactions', filter=models.Q(interactions__interaction_type='like')
+            ),
+            collect_count=models.Count(
+                'interactions', filter=models.Q(interactions__interaction_type='collect')
+            ),
+        )
+    
+    def with_interaction_type_counts(self):
+        """
+        Annotate <type>_interactions for every interaction type, as read by
+        PinSerializer.get_interaction_count
+        """
+        return self.annotate(**{
+            f'{interaction_type}_interactions': models.Count(
+                'interactions',
+                filter=models.Q(interactions__interaction_type=interaction_type)
+            )
+            for interaction_type, _ in PinInteraction.INTERACTION_TYPES
+        })
+
+
 class Pin(models.Model):
     """
     Model representing a music pin dropped at a physical location.
@@ -75,6 +115,8 @@ class Pin(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = PinQuerySet.as_manager()
+    
     class Meta:
         indexes = [
             models.Index(fields=['created_at']),
@@ -83,10 +125,21 @@ class Pin(models.Model):
             models.Index(fields=['genre']),
             models.Index(fields=['mood']),
             models.Index(fields=['is_private']),
+            # Partial indexes: only pins that can expire / public pins are indexed
+            models.Index(
+                fields=['expiration_date'],
+                condition=models.Q(expiration_date__isnull=False),
+                name='pin_expiration_partial_idx',
+            ),
+            models.Index(
+                fields=['-created_at'],
+                condition=models.Q(is_private=False),
+                name='pin_public_created_idx',
+            ),
         ]
     
     def __str__(self):
-        return f"{self.title} by {self.owner.username} - {self.track_title}"
+        return f"{self.title} - {self.track_title} (owner {self.owner_id})"
     
     @cached_property
     def total_interactions(self):
@@ -164,10 +217,22 @@ class PinInteraction(models.Model):
         indexes = [
             models.Index(fields=['interaction_type']),
             models.Index(fields=['created_at']),
+            # Per-pin counts by type and time window (serializers, analytics,
+            # trending); equality columns first, the range column last
+            models.Index(
+                fields=['pin', 'interaction_type', 'created_at'],
+                name='pininteraction_pin_type_ts_idx',
+            ),
+            # A user's own interactions, optionally filtered by type
+            # (PinInteractionViewSet list)
+            models.Index(
+                fields=['user', 'interaction_type'],
+                name='pininteraction_user_type_idx',
+            ),
         ]
         
     def __str__(self):
-        return f"{self.user.username} {self.interaction_type} {self.pin.title}"
+        return f"User {self.user_id} {self.interaction_type} pin {self.pin_id}"
 
 
 class PinAnalytics(models.Model):
@@ -185,37 +250,60 @@ class PinAnalytics(models.Model):
         verbose_name_plural = "Pin analytics"
     
     def __str__(self):
-        return f"Analytics for {self.pin.title}"
+        return f"Analytics for pin {self.pin_id}"
     
     @classmethod
     def update_for_pin(cls, pin):
         """Update analytics for a pin"""
-        from django.db.models import Count
+        from django.db import transaction
+        from django.db.models import Count, Q
         from django.utils import timezone
         from datetime import timedelta
         
-        analytics, created = cls.objects.get_or_create(pin=pin)
-        
-        # Update metrics
-        analytics.total_views = pin.interactions.filter(interaction_type='view').count()
-        analytics.unique_viewers = pin.interactions.filter(interaction_type='view').values('user').distinct().count()
-        
-        # Calculate collection rate
-        if analytics.total_views > 0:
-            collect_count = pin.interactions.filter(interaction_type='collect').count()
-            analytics.collection_rate = (collect_count / analytics.total_views)
-        
-        # Find peak hour
-        recent_views = pin.interactions.filter(
-            interaction_type='view',
-            created_at__gte=timezone.now() - timedelta(days=7)
-        )
-        if recent_views.exists():
-            hour_counts = recent_views.extra(
-                {'hour': "EXTRACT(HOUR FROM created_at)"}
-            ).values('hour').annotate(count=Count('id')).order_by('-count')
-            if hour_counts:
-                analytics.peak_hour = hour_counts[0]['hour']
-        
-        analytics.save()
+        with transaction.atomic():
+            # Lock only the analytics row; if another worker is already
+            # recomputing this pin, skip rather than queue behind its lock
+            locked = cls.objects.select_for_update(
+                skip_locked=True, of=('self',)
+            ).filter(pin=pin)
+            analytics = locked.first()
+            if analytics is None:
+                # Either the row doesn't exist yet or it is locked elsewhere.
+                # INSERT ... ON CONFLICT DO NOTHING creates it without the
+                # SELECT and savepoint of get_or_create, then retry the lock
+                cls.objects.bulk_create([cls(pin=pin)], ignore_conflicts=True)
+                analytics = locked.first()
+                if analytics is None:
+                    return None
+            
+            # Update metrics (all counts in a single aggregate query)
+            view_filter = Q(interaction_type='view')
+            totals = pin.interactions.aggregate(
+                total_views=Count('id', filter=view_filter),
+                unique_viewers=Count('user', filter=view_filter, distinct=True),
+                collect_count=Count('id', filter=Q(interaction_type='collect')),
+            )
+            analytics.total_views = totals['total_views']
+            analytics.unique_viewers = totals['unique_viewers']
+            
+            # Calculate collection rate
+            if analytics.total_views > 0:
+                analytics.collection_rate = (totals['collect_count'] / analytics.total_views)
+            
+            # Find peak hour
+            recent_views = pin.interactions.filter(
+                interaction_type='view',
+                created_at__gte=timezone.now() - timedelta(days=7)
+            )
+            if recent_views.exists():
+                hour_counts = recent_views.extra(
+                    {'hour': "EXTRACT(HOUR FROM created_at)"}
+                ).values('hour').annotate(count=Count('id')).order_by('-count')
+                if hour_counts:
+                    analytics.peak_hour = hour_counts[0]['hour']
+            
+            analytics.save(update_fields=[
+                'total_views', 'unique_viewers', 'collection_rate', 'peak_hour',
+                'last_updated'
+            ])
         return analytics
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from rest_framework_gis.serializers import GeoFeatureModelSerializer
 from .models import Pin, PinInteraction
-from users.serializers import UserSerializer
+from users.serializers import UserMiniSerializer
 from gamification.serializers import PinSkinSerializer
 from bopmaps.serializers import BaseSerializer, TimeStampedModelSerializer
 from bopmaps.validators import MusicURLValidator
@@ -10,11 +10,20 @@ import logging
 
 logger = logging.getLogger('bopmaps')
 
+
+def _context_now(serializer):
+    """Return one timestamp shared by every object in a serialization pass"""
+    context = serializer.context
+    if 'now' not in context:
+        context['now'] = timezone.now()
+    return context['now']
+
+
 class PinSerializer(TimeStampedModelSerializer):
     """
     Serializer for Pin model
     """
-    owner = UserSerializer(read_only=True)
+    owner = UserMiniSerializer(read_only=True)
     skin_details = PinSkinSerializer(source='skin', read_only=True)
     interaction_count = serializers.SerializerMethodField()
     distance = serializers.SerializerMethodField()
@@ -39,9 +48,13 @@ class PinSerializer(TimeStampedModelSerializer):
         """Get count of different interactions for this pin"""
         counts = {}
         for interaction_type, _ in PinInteraction.INTERACTION_TYPES:
-            counts[interaction_type] = obj.interactions.filter(
-                interaction_type=interaction_type
-            ).count()
+            # Annotated by with_interaction_type_counts(); otherwise query
+            count = getattr(obj, f'{interaction_type}_interactions', None)
+            if count is None:
+                count = obj.interactions.filter(
+                    interaction_type=interaction_type
+                ).count()
+            counts[interaction_type] = count
         return counts
     
     def get_distance(self, obj):
@@ -54,7 +67,7 @@ class PinSerializer(TimeStampedModelSerializer):
     def get_has_expired(self, obj):
         """Check if pin has expired"""
         if obj.expiration_date:
-            return obj.expiration_date < timezone.now()
+            return obj.expiration_date < _context_now(self)
         return False
     
     def validate(self, data):
@@ -118,10 +131,11 @@ class PinGeoSerializer(GeoFeatureModelSerializer):
         ]
     
     def get_like_count(self, obj):
-        return obj.interactions.filter(interaction_type='like').count()
+        # Annotated by with_interaction_counts(); falls back to a query per pin
+        return obj.like_count
     
     def get_collect_count(self, obj):
-        return obj.interactions.filter(interaction_type='collect').count()
+        return obj.collect_count
         
     def get_distance(self, obj):
         """Get distance if annotated by the query"""
@@ -133,7 +147,7 @@ class PinGeoSerializer(GeoFeatureModelSerializer):
     def get_has_expired(self, obj):
         """Check if pin has expired"""
         if obj.expiration_date:
-            return obj.expiration_date < timezone.now()
+            return obj.expiration_date < _context_now(self)
         return False
 
 
@@ -0,0 +1,88 @@
+"""
+Celery tasks for pin bookkeeping that doesn't need to block a request
+"""
+
+import logging
+from datetime import timedelta
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from celery import shared_task, group
+
+from .models import Pin, PinInteraction, PinAnalytics
+from .utils import record_pin_interaction
+
+logger = logging.getLogger('bopmaps')
+User = get_user_model()
+
+# Repeat views within this window are not recorded again
+VIEW_DEDUPE_WINDOW = timedelta(hours=1)
+
+# Pins with interactions in this window get their analytics refreshed
+ANALYTICS_REFRESH_WINDOW = timedelta(hours=1)
+
+@shared_task(ignore_result=True, acks_late=True, reject_on_worker_lost=True)
+def record_pin_view(user_id, pin_id):
+    """
+    Record a view interaction unless the user already viewed the pin
+    within the last hour
+    
+    Args:
+        user_id: ID of the viewing user
+        pin_id: ID of the viewed pin
+    """
+    try:
+        if PinInteraction.objects.filter(
+            user_id=user_id,
+            pin_id=pin_id,
+            interaction_type='view',
+            created_at__gte=timezone.now() - VIEW_DEDUPE_WINDOW
+        ).exists():
+            return
+            
+        user = User.objects.only('id', 'username').get(pk=user_id)
+        pin = Pin.objects.only('id').get(pk=pin_id)
+        record_pin_interaction(user=user, pin=pin, interaction_type='view')
+        
+    except (User.DoesNotExist, Pin.DoesNotExist):
+        logger.warning(f"Pin {pin_id} or user {user_id} was removed before the view could be recorded")
+    except Exception as e:
+        logger.error(f"Error recording view for pin {pin_id}: {str(e)}")
+
+@shared_task(ignore_result=True, acks_late=True, reject_on_worker_lost=True)
+def update_pin_analytics(pin_id):
+    """
+    Recompute the analytics row for a single pin
+    
+    Args:
+        pin_id: ID of the pin to update
+    """
+    try:
+        pin = Pin.objects.only('id').get(pk=pin_id)
+        PinAnalytics.update_for_pin(pin)
+    except Pin.DoesNotExist:
+        logger.warning(f"Pin {pin_id} was removed before its analytics could be updated")
+    except Exception as e:
+        logger.error(f"Error updating analytics for pin {pin_id}: {str(e)}")
+
+@shared_task(ignore_result=True)
+def refresh_pin_analytics():
+    """
+    Queue an analytics update for every pin interacted with recently
+    
+    Each pin is its own task so the updates spread across the worker pool
+    and one slow pin doesn't hold up the rest.
+    """
+    since = timezone.now() - ANALYTICS_REFRESH_WINDOW
+    pin_ids = (
+        PinInteraction.objects.filter(created_at__gte=since)
+        .order_by()
+        .values_list('pin_id', flat=True)
+        .distinct()
+    )
+    
+    # One group dispatch instead of a serial .delay() per pin
+    signatures = [update_pin_analytics.s(pin_id) for pin_id in pin_ids]
+    if signatures:
+        group(signatures).apply_async()
+        
+    logger.info(f"Queued analytics updates for {len(signatures)} pins")
@@ -9,6 +9,19 @@ from .models import Pin, PinInteraction
 
 logger = logging.getLogger('bopmaps')
 
+# Columns rendered by PinGeoSerializer; map/nearby queries only load these
+PIN_GEO_FIELDS = (
+    'id', 'location', 'title', 'track_title', 'track_artist', 'service',
+    'rarity', 'aura_radius', 'expiration_date', 'created_at',
+    'owner__id', 'owner__username',
+)
+
+# Wide user columns PinSerializer never reads; its owner is UserMiniSerializer
+PIN_OWNER_DEFERRED_FIELDS = (
+    'owner__password', 'owner__bio', 'owner__location', 'owner__ban_reason',
+    'owner__fcm_token',
+)
+
 def get_nearby_pins(user, lat, lng, radius_meters=1000, limit=50):
     """
     Get pins near a given location.
@@ -29,19 +42,16 @@ def get_nearby_pins(user, lat, lng, radius_meters=1000, limit=50):
         user_location = Point(float(lng), float(lat))
         
         # Filter pins
-        pins = Pin.objects.filter(
-            # Exclude expired pins
-            Q(expiration_date__isnull=True) | Q(expiration_date__gt=timezone.now()),
+        # Exclude expired pins
+        pins = Pin.objects.active().filter(
             # Exclude private pins from other users
             Q(is_private=False) | Q(owner=user)
-        ).annotate(
-            distance=Distance('location', user_location),
-            like_count=Count('interactions', filter=Q(interactions__interaction_type='like')),
-            collect_count=Count('interactions', filter=Q(interactions__interaction_type='collect'))
+        ).with_interaction_counts().annotate(
+            distance=Distance('location', user_location)
         ).filter(
             # Filter by distance
             distance__lte=D(m=radius_meters)
-        ).order_by('distance')[:limit]
+        ).select_related('owner').only(*PIN_GEO_FIELDS).order_by('distance')[:limit]
         
         return pins
         
@@ -60,20 +70,23 @@ def record_pin_interaction(user, pin, interaction_type):
         interaction_type: Type of interaction (view, collect, like, share)
         
     Returns:
-        The created or updated PinInteraction object
+        The created or updated PinInteraction object (its pk is not populated)
     """
     try:
-        # Check if this interaction already exists
-        interaction, created = PinInteraction.objects.get_or_create(
+        # Single INSERT ... ON CONFLICT DO UPDATE: repeated interactions just
+        # refresh the timestamp instead of a SELECT followed by an INSERT/UPDATE
+        interaction = PinInteraction(
             user=user,
             pin=pin,
-            interaction_type=interaction_type
+            interaction_type=interaction_type,
+            created_at=timezone.now()
+        )
+        PinInteraction.objects.bulk_create(
+            [interaction],
+            update_conflicts=True,
+            unique_fields=['user', 'pin', 'interaction_type'],
+            update_fields=['created_at']
         )
-        
-        # If not created, just update the timestamp
-        if not created:
-            interaction.created_at = timezone.now()
-            interaction.save(update_fields=['created_at'])
             
         logger.info(f"User {user.username} {interaction_type} pin {pin.id}")
         return interaction
@@ -100,7 +113,7 @@ def get_trending_pins(days=7, limit=20):
         
         # Get pins with most interactions in the timeframe - Complete rewrite
         recent_pins = Pin.objects.filter(created_at__gte=since)
-        active_pins = recent_pins.filter(Q(expiration_date__isnull=True) | Q(expiration_date__gt=timezone.now()))
+        active_pins = recent_pins.active()
         public_pins = active_pins.filter(is_private=False)
         
         # Annotate with interaction count
@@ -108,8 +121,12 @@ def get_trending_pins(days=7, limit=20):
             interaction_count=Count('interactions', filter=Q(interactions__created_at__gte=since))
         )
         
-        # Order and limit
-        result = trending_pins.order_by('-interaction_count', '-created_at')[:limit]
+        # Order and limit; owner and skin are embedded by PinSerializer
+        result = trending_pins.select_related('owner', 'skin').defer(
+            *PIN_OWNER_DEFERRED_FIELDS
+        ).with_interaction_type_counts().order_by(
+            '-interaction_count', '-created_at'
+        )[:limit]
         
         return result
         
@@ -118,33 +135,6 @@ def get_trending_pins(days=7, limit=20):
         raise
 
 
-def check_pin_visibility(pin, user):
-    """
-    Check if a pin is visible to a specific user.
-    
-    Args:
-        pin: The pin to check
-        user: The user to check visibility for
-        
-    Returns:
-        Boolean indicating if the pin is visible to the user
-    """
-    # Check if the pin is expired
-    if pin.expiration_date and pin.expiration_date < timezone.now():
-        return False
-        
-    # User can always see their own pins
-    if pin.owner == user:
-        return True
-        
-    # Private pins are only visible to their owners
-    if pin.is_private:
-        return False
-        
-    # Public pins are visible to everyone
-    return True
-
-
 def get_clustered_pins(user, lat, lng, zoom, radius_meters=2000):
     """
     Get pins for map display with cluster parameters based on zoom level
@@ -3,6 +3,7 @@ from django.db import transaction
 from django.contrib.gis.geos import Point
 from django.utils import timezone
 from django.db import models
+from django.core.cache import cache
 from rest_framework import status, viewsets, mixins
 from rest_framework.response import Response
 from rest_framework.decorators import action, api_view, permission_classes
@@ -11,15 +12,27 @@ from datetime import timedelta
 
 from .models import Pin, PinInteraction
 from .serializers import PinSerializer, PinGeoSerializer, PinInteractionSerializer
-from .utils import get_nearby_pins, record_pin_interaction, get_trending_pins, check_pin_visibility, get_clustered_pins
+from .tasks import record_pin_view
+from .utils import (
+    get_nearby_pins, record_pin_interaction, get_trending_pins,
+    get_clustered_pins, PIN_GEO_FIELDS, PIN_OWNER_DEFERRED_FIELDS
+)
 
 from bopmaps.views import BaseModelViewSet
 from bopmaps.permissions import IsOwnerOrReadOnly
 from bopmaps.utils import create_error_response
+from cache_system import CACHE_TIMEOUTS
 import logging
 
 logger = logging.getLogger('bopmaps')
 
+# Pins newer than this get the pulse animation on the map
+PULSE_WINDOW = timedelta(hours=24)
+
+# Interaction endpoints filter visibility in SQL; beyond the id they only need
+# owner_id, which IsOwnerOrReadOnly compares without loading the owner
+PIN_INTERACTION_FIELDS = ('id', 'owner')
+
 class PinViewSet(BaseModelViewSet):
     """
     API viewset for Pin CRUD operations
@@ -34,23 +47,41 @@ class PinViewSet(BaseModelViewSet):
         return PinSerializer
     
     def get_queryset(self):
-        queryset = super().get_queryset()
+        # PinSerializer embeds the owner and skin; join them up front
+        queryset = super().get_queryset().select_related('owner', 'skin')
         
         # Filter expired pins
-        queryset = queryset.filter(
-            models.Q(expiration_date__isnull=True) | 
-            models.Q(expiration_date__gt=timezone.now())
-        )
+        queryset = queryset.active()
         
-        # Filter private pins (only show user's own private pins)
-        if self.action in ['list', 'list_map', 'nearby']:
+        # Filter private pins (only show user's own private pins). The
+        # interaction endpoints filter here too, so a hidden pin is never loaded
+        if self.action in ['list', 'list_map', 'nearby', 'map_details',
+                           'view', 'like', 'collect', 'share']:
             queryset = queryset.filter(
                 models.Q(is_private=False) | 
                 models.Q(owner=self.request.user)
             )
         
+        # Interaction endpoints only need the id and owner_id of the pin
+        if self.action in ['view', 'like', 'collect', 'share']:
+            queryset = queryset.select_related(None).only(*PIN_INTERACTION_FIELDS)
+        elif self.action in ['list', 'retrieve', 'map_details']:
+            # PinSerializer embeds the owner and per-type interaction counts
+            queryset = queryset.defer(
+                *PIN_OWNER_DEFERRED_FIELDS
+            ).with_interaction_type_counts()
+        
         return queryset
     
+    def perform_create(self, serializer):
+        """
+        Create the pin and bump the owner's pins_created counter in the same
+        transaction
+        """
+        with transaction.atomic():
+            super().perform_create(serializer)
+            self.request.user.increment_pins_created()
+    
     @action(detail=False, methods=['get'])
     def list_map(self, request):
         """
@@ -101,7 +132,9 @@ class PinViewSet(BaseModelViewSet):
                     return create_error_response("Invalid coordinates", status.HTTP_400_BAD_REQUEST)
             else:
                 # No location - return recent pins with a limit
-                pins = queryset.order_by('-created_at')[:100]
+                pins = queryset.select_related(None).select_related('owner').only(
+                    *PIN_GEO_FIELDS
+                ).with_interaction_counts().order_by('-created_at')[:100]
                 cluster_params = {
                     'enabled': True,
                     'distance': 60,
@@ -177,8 +210,28 @@ class PinViewSet(BaseModelViewSet):
                 days = 7
                 limit = 20
                 
-            pins = get_trending_pins(days=days, limit=limit)
-            serializer = PinSerializer(pins, many=True)
+            # Only the ranking (pin ids) is shared, since it's the expensive
+            # part; it can be up to CACHE_TIMEOUTS['trending'] old
+            cache_key = f"trending_pins:{days}:{limit}"
+            pin_ids = cache.get(cache_key)
+            if pin_ids is None:
+                pin_ids = list(
+                    get_trending_pins(days=days, limit=limit).values_list('id', flat=True)
+                )
+                cache.set(cache_key, pin_ids, CACHE_TIMEOUTS['trending'])
+                
+            # Load the pins per request: deleted, expired or newly private pins
+            # drop out straight away, and user-specific fields (skin is_owned)
+            # are evaluated for the caller
+            pins = Pin.objects.active().filter(
+                id__in=pin_ids, is_private=False
+            ).select_related('owner', 'skin').defer(
+                *PIN_OWNER_DEFERRED_FIELDS
+            ).with_interaction_type_counts()
+            pins_by_id = {pin.id: pin for pin in pins}
+            ranked = [pins_by_id[pin_id] for pin_id in pin_ids if pin_id in pins_by_id]
+            
+            serializer = PinSerializer(ranked, many=True, context={'request': request})
             return Response(serializer.data)
             
         except Exception as e:
@@ -218,25 +271,18 @@ class PinViewSet(BaseModelViewSet):
         """
         Get detailed pin information for map display with aura visualization settings
         """
+        # Resolve the pin outside the catch-all so a missing pin surfaces as
+        # DRF's 404 instead of being logged and returned as a 500. Expired and
+        # other users' private pins are excluded by get_queryset.
+        pin = self.get_object()
+        
         try:
-            pin = self.get_object()
-            
-            # Check if the pin is visible to the user
-            if not check_pin_visibility(pin, request.user):
-                return create_error_response("Pin is not available", status.HTTP_404_NOT_FOUND)
-            
-            # Record view interaction if not already viewed in the last hour
-            if not PinInteraction.objects.filter(
-                user=request.user, 
-                pin=pin, 
-                interaction_type='view',
-                created_at__gte=timezone.now() - timedelta(hours=1)
-            ).exists():
-                record_pin_interaction(
-                    user=request.user,
-                    pin=pin,
-                    interaction_type='view'
-                )
+            # Record view interaction (deduplicated per hour) off the request path.
+            # A broker outage shouldn't fail a read-only request.
+            try:
+                record_pin_view.delay(request.user.id, pin.id)
+            except Exception as e:
+                logger.error(f"Error queueing view for pin {pin.id}: {str(e)}")
             
             # Get details with customized serializer for map display
             serializer = PinSerializer(pin)
@@ -261,7 +307,7 @@ class PinViewSet(BaseModelViewSet):
             data['visualization'] = {
                 'aura_color': service_colors.get(pin.service, '#3388ff'),
                 'aura_opacity': rarity_opacity.get(pin.rarity, 0.7),
-                'pulse_animation': pin.created_at > (timezone.now() - timedelta(hours=24)),
+                'pulse_animation': pin.created_at > (timezone.now() - PULSE_WINDOW),
                 'icon_url': pin.skin.image_url if hasattr(pin, 'skin') and pin.skin and hasattr(pin.skin, 'image_url') else None
             }
             
@@ -275,23 +321,25 @@ class PinViewSet(BaseModelViewSet):
         """
         Helper method to record pin interactions
         """
+        # Resolve the pin outside the catch-all so a missing pin surfaces as
+        # DRF's 404 instead of being logged and returned as a 500. Expired and
+        # other users' private pins are excluded by get_queryset.
+        pin = self.get_object()
+        
         try:
-            pin = self.get_object()
-            
-            # Check if the pin is visible to the user
-            if not check_pin_visibility(pin, request.user):
-                return create_error_response("Pin is not available", status.HTTP_404_NOT_FOUND)
+            # Record the interaction and update the counter in one transaction so
+            # a failure can't leave a collect recorded without its count
+            with transaction.atomic():
+                interaction = record_pin_interaction(
+                    user=request.user,
+                    pin=pin,
+                    interaction_type=interaction_type
+                )
                 
-            # Record the interaction
-            interaction = record_pin_interaction(
-                user=request.user,
-                pin=pin,
-                interaction_type=interaction_type
-            )
-            
-            # For collect interaction, increment the user's pins_collected count
-            if interaction_type == 'collect':
-                with transaction.atomic():
+                # For collect interaction, increment the user's pins_collected
+                # count. The increment is done in SQL, so request.user can be
+                # used directly without re-fetching and locking the row.
+                if interaction_type == 'collect':
                     request.user.increment_pins_collected()
                     
             return Response({
@@ -11,6 +11,7 @@ import os
 import sys
 import random
 import json
+from collections import Counter
 from datetime import datetime, timedelta
 from django.utils import timezone
 from django.contrib.auth import get_user_model
@@ -367,6 +368,13 @@ def create_pin_interactions(users, pins, num_interactions):
     """Create sample pin interactions"""
     print(f"Creating {num_interactions} pin interactions...")
     interactions = []
+    collected = Counter()
+    
+    # Existing interactions, so reruns skip them without a query per row
+    seen = set(
+        PinInteraction.objects.filter(pin__in=pins)
+        .values_list('user_id', 'pin_id', 'interaction_type')
+    )
     
     for _ in range(num_interactions):
         # Get a random user and pin
@@ -374,28 +382,34 @@ def create_pin_interactions(users, pins, num_interactions):
         pin = random.choice(pins)
         
         # Skip if user is the pin owner (they can't interact with their own pins)
-        if pin.owner == user:
+        if pin.owner_id == user.id:
             continue
             
         # Get a random interaction type
         interaction_type = random.choice(['view', 'collect', 'like', 'share'])
         
         # Check if this interaction already exists
-        if PinInteraction.objects.filter(user=user, pin=pin, interaction_type=interaction_type).exists():
+        key = (user.id, pin.id, interaction_type)
+        if key in seen:
             continue
+        seen.add(key)
             
-        # Create the interaction
-        interaction = PinInteraction.objects.create(
+        interactions.append(PinInteraction(
             user=user,
             pin=pin,
             interaction_type=interaction_type,
-        )
-        interactions.append(interaction)
+        ))
         
         # Update user stats if appropriate
         if interaction_type == 'collect':
-            user.pins_collected += 1
-            user.save(update_fields=['pins_collected'])
+            collected[user] += 1
+    
+    interactions = PinInteraction.objects.bulk_create(interactions, batch_size=500)
+    
+    # One UPDATE batch for the collect counters instead of a save per collect
+    for user, count in collected.items():
+        user.pins_collected += count
+    User.objects.bulk_update(list(collected), ['pins_collected'], batch_size=500)
             
     return interactions
 
@@ -431,16 +445,16 @@ def create_user_locations(users):
                 base_lng, base_lat = user.location.x, user.location.y
                 lng, lat = get_random_location((base_lng, base_lat), 3)
                 
-                # Create the location entry
-                location = UserLocation.objects.create(
+                # Build the location entry
+                locations.append(UserLocation(
                     user=user,
                     location=Point(lng, lat),
                     # Random timestamp in the past week
                     timestamp=timezone.now() - timedelta(days=random.randint(0, 7)),
-                )
-                locations.append(location)
+                ))
                 
-    return locations
+    # Insert the whole history in batched INSERTs instead of one per row
+    return UserLocation.objects.bulk_create(locations, batch_size=500)
 
 def create_user_achievements(users, achievements):
     """Assign random achievements to users"""
@@ -556,8 +570,8 @@ def create_recent_tracks(users):
             track_data = random.choice(sample_tracks)
             service = random.choice(services)
             
-            # Create a recent track
-            track = RecentTrack.objects.create(
+            # Build a recent track
+            tracks.append(RecentTrack(
                 user=user,
                 track_id=f"track_{random.randint(10000, 99999)}",
                 title=track_data["title"],
@@ -566,10 +580,10 @@ def create_recent_tracks(users):
                 album_art=track_data["album_art"],
                 service=service,
                 played_at=timezone.now() - timedelta(hours=random.randint(1, 48)),
-            )
-            tracks.append(track)
+            ))
             
-    return tracks
+    # Insert all tracks in batched INSERTs instead of one per row
+    return RecentTrack.objects.bulk_create(tracks, batch_size=500)
 
 @transaction.atomic
 def generate_all_sample_data():
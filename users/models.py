@@ -1,6 +1,8 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.contrib.gis.db import models as gis_models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models.functions import Upper
 from django.utils import timezone
 from django.core.validators import RegexValidator
 from django.conf import settings
@@ -86,6 +88,22 @@ class User(AbstractUser, ValidationModelMixin):
             models.Index(fields=['apple_music_connected']),
             models.Index(fields=['soundcloud_connected']),
             models.Index(fields=['is_banned']),
+            # Partial index: only banned users are scanned for expired bans
+            models.Index(
+                fields=['banned_until'],
+                condition=models.Q(is_banned=True),
+                name='user_active_ban_idx',
+            ),
+            # Trigram indexes for substring search (admin search_fields use
+            # icontains, i.e. UPPER(col) LIKE '%term%')
+            GinIndex(
+                OpClass(Upper('username'), name='gin_trgm_ops'),
+                name='user_username_trgm_idx',
+            ),
+            GinIndex(
+                OpClass(Upper('email'), name='gin_trgm_ops'),
+                name='user_email_trgm_idx',
+            ),
         ]
     
     def __str__(self):
@@ -122,13 +140,19 @@ class User(AbstractUser, ValidationModelMixin):
     
     def increment_pins_created(self):
         """Increment pins created count"""
+        # Increment in SQL so concurrent requests can't overwrite each other
+        type(self).objects.filter(pk=self.pk).update(
+            pins_created=models.F('pins_created') + 1
+        )
         self.pins_created += 1
-        self.save(update_fields=['pins_created'])
     
     def increment_pins_collected(self):
         """Increment pins collected count"""
+        # Increment in SQL so concurrent requests can't overwrite each other
+        type(self).objects.filter(pk=self.pk).update(
+            pins_collected=models.F('pins_collected') + 1
+        )
         self.pins_collected += 1
-        self.save(update_fields=['pins_collected'])
         
     def check_ban_status(self):
         """
@@ -138,10 +162,19 @@ class User(AbstractUser, ValidationModelMixin):
         if not self.is_banned:
             return False
             
-        if self.banned_until and self.banned_until < timezone.now():
+        now = timezone.now()
+        if self.banned_until and self.banned_until <= now:
+            # Conditional UPDATE: if the ban was extended since this instance
+            # was loaded, no row matches and the new ban stays in place
+            lifted = type(self).objects.filter(
+                pk=self.pk, is_banned=True, banned_until__lte=now
+            ).update(is_banned=False, banned_until=None)
+            if not lifted:
+                self.refresh_from_db(fields=['is_banned', 'banned_until'])
+                return self.is_banned
+                
             self.is_banned = False
             self.banned_until = None
-            self.save(update_fields=['is_banned', 'banned_until'])
             logger.info(f"User {self.username} ban has expired and been lifted.")
             return False
             
@@ -31,6 +31,15 @@ class UserSerializer(BaseSerializer):
         return value
 
 
+class UserMiniSerializer(BaseReadOnlySerializer):
+    """
+    Lightweight read-only serializer for embedding a user in other resources
+    """
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'profile_pic']
+
+
 class UserGeoSerializer(GeoFeatureModelSerializer):
     """
     GeoJSON serializer for User model
@@ -140,13 +149,21 @@ class UserUpdateSerializer(BaseSerializer):
         current_password = validated_data.pop('current_password', None)
         new_password = validated_data.pop('new_password', None)
         
-        # Update the instance with the validated data
-        instance = super().update(instance, validated_data)
+        # Apply the changes and the password (if provided) in a single UPDATE
+        # limited to the submitted columns, instead of two full-row saves
+        update_fields = list(validated_data)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
         
-        # Update password if provided
         if current_password and new_password:
             instance.set_password(new_password)
-            instance.save()
+            update_fields.append('password')
+            
+        if update_fields:
+            # last_active is auto_now; keep bumping it like a full save did
+            instance.save(update_fields=update_fields + ['last_active'])
+            
+        if 'password' in update_fields:
             logger.info(f"Password updated for user: {instance.username}")
             
         return instance
@@ -175,4 +192,11 @@ class PasswordResetConfirmSerializer(serializers.Serializer):
             validate_password(value)
         except ValidationError as e:
             raise serializers.ValidationError(e.messages)
-        return value 
\ No newline at end of file
+        return value 
+
+class LocationUpdateSerializer(serializers.Serializer):
+    """
+    Serializer for validating a location update
+    """
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
@@ -0,0 +1,38 @@
+"""
+Celery tasks for periodic user account maintenance
+"""
+
+import logging
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from celery import shared_task
+
+logger = logging.getLogger('bopmaps')
+User = get_user_model()
+
+@shared_task(ignore_result=True, acks_late=True, reject_on_worker_lost=True)
+def lift_expired_bans():
+    """
+    Lift every temporary ban whose banned_until has passed
+    
+    Runs as a single UPDATE instead of loading each banned user and calling
+    check_ban_status() (one SELECT and one UPDATE per row).
+    
+    Returns:
+        int: Number of users unbanned
+    """
+    now = timezone.now()
+    expired = User.objects.filter(is_banned=True, banned_until__lte=now)
+    
+    # Collect the ids up front so the log names who was unbanned
+    user_ids = list(expired.values_list('id', flat=True))
+    if not user_ids:
+        return 0
+    
+    # Repeat the expiry condition so a ban extended in the meantime is kept
+    unbanned = expired.filter(id__in=user_ids).update(
+        is_banned=False, banned_until=None
+    )
+    
+    logger.info(f"Lifted {unbanned} expired bans: users {user_ids}")
+    return unbanned
@@ -5,6 +5,7 @@ from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
 from django.contrib.auth import get_user_model
 from django.contrib.gis.geos import Point
 from django.db import transaction
@@ -13,6 +14,7 @@ from django.conf import settings
 from .serializers import (
     UserSerializer, UserUpdateSerializer, UserRegistrationSerializer,
     PasswordResetRequestSerializer, PasswordResetConfirmSerializer,
+    LocationUpdateSerializer,
 )
 from bopmaps.views import BaseModelViewSet
 from bopmaps.permissions import IsOwnerOrReadOnly, IsOwner
@@ -79,35 +81,30 @@ class UserViewSet(BaseModelViewSet):
         """
         Update the current user's location
         """
-        try:
-            lat = request.data.get('latitude')
-            lng = request.data.get('longitude')
-            
-            if not lat or not lng:
-                return create_error_response("Latitude and longitude are required", status.HTTP_400_BAD_REQUEST)
-            
-            try:
-                point = Point(float(lng), float(lat), srid=4326)
-            except (ValueError, TypeError):
-                return create_error_response("Invalid coordinates", status.HTTP_400_BAD_REQUEST)
+        serializer = LocationUpdateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return create_error_response("Valid latitude and longitude are required", status.HTTP_400_BAD_REQUEST)
             
-            with transaction.atomic():
-                request.user.location = point
-                request.user.last_location_update = timezone.now()
-                request.user.save(update_fields=['location', 'last_location_update'])
-                
-            return Response({
-                "success": True,
-                "message": "Location updated successfully",
-                "location": {
-                    "latitude": lat,
-                    "longitude": lng,
-                    "updated_at": request.user.last_location_update
-                }
-            })
+        lat = serializer.validated_data['latitude']
+        lng = serializer.validated_data['longitude']
+        
+        try:
+            request.user.location = Point(lng, lat, srid=4326)
+            request.user.last_location_update = timezone.now()
+            request.user.save(update_fields=['location', 'last_location_update'])
         except Exception as e:
             logger.error(f"Error updating user location: {str(e)}")
             return create_error_response(str(e), status.HTTP_500_INTERNAL_SERVER_ERROR)
+            
+        return Response({
+            "success": True,
+            "message": "Location updated successfully",
+            "location": {
+                "latitude": lat,
+                "longitude": lng,
+                "updated_at": request.user.last_location_update
+            }
+        })
     
     @action(detail=False, methods=['post'])
     def update_fcm_token(self, request):
@@ -119,9 +116,12 @@ class UserViewSet(BaseModelViewSet):
             if not fcm_token:
                 return create_error_response("FCM token is required", status.HTTP_400_BAD_REQUEST)
             
-            with transaction.atomic():
-                request.user.fcm_token = fcm_token
-                request.user.save(update_fields=['fcm_token'])
+            # Clients re-send the token on every launch; skip the write when
+            # it hasn't changed
+            if fcm_token != request.user.fcm_token:
+                with transaction.atomic():
+                    request.user.fcm_token = fcm_token
+                    request.user.save(update_fields=['fcm_token'])
                 
             return Response({
                 "success": True,
@@ -137,29 +137,27 @@ class AuthTokenObtainPairView(TokenObtainPairView):
     Custom token obtain pair view with extra data
     """
     def post(self, request, *args, **kwargs):
-        response = super().post(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data)
         
-        if response.status_code == 200:
-            try:
-                # Add user data to response
-                username = request.data.get('username')
-                user = User.objects.get(username=username)
-                user_data = UserSerializer(user).data
-                
-                # Update response with user data
-                data = response.data
-                data['user'] = user_data
-                
-                # Update last active
-                user.update_last_active()
-                
-                return Response(data)
-            except User.DoesNotExist:
-                logger.error(f"User not found during token obtain: {username}")
-            except Exception as e:
-                logger.error(f"Error adding user data to token response: {str(e)}")
-                
-        return response
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+            
+        data = serializer.validated_data
+        
+        try:
+            # The serializer already authenticated the user; reuse it
+            # instead of looking the user up again by username
+            user = serializer.user
+            data['user'] = UserSerializer(user).data
+            
+            # Update last active
+            user.update_last_active()
+        except Exception as e:
+            logger.error(f"Error adding user data to token response: {str(e)}")
+            
+        return Response(data, status=status.HTTP_200_OK)
 
 
 class RegistrationView(generics.CreateAPIView):
@@ -175,20 +173,22 @@ class RegistrationView(generics.CreateAPIView):
         
         if serializer.is_valid():
             try:
+                # Keep the transaction to the INSERT itself; token signing and
+                # response serialization don't need to hold it open
                 with transaction.atomic():
                     user = serializer.save()
                     
-                    # Generate JWT tokens
-                    refresh = RefreshToken.for_user(user)
-                    
-                    return Response({
-                        'message': 'User registered successfully',
-                        'user': UserSerializer(user).data,
-                        'tokens': {
-                            'refresh': str(refresh),
-                            'access': str(refresh.access_token),
-                        }
-                    }, status=status.HTTP_201_CREATED)
+                # Generate JWT tokens
+                refresh = RefreshToken.for_user(user)
+                
+                return Response({
+                    'message': 'User registered successfully',
+                    'user': UserSerializer(user).data,
+                    'tokens': {
+                        'refresh': str(refresh),
+                        'access': str(refresh.access_token),
+                    }
+                }, status=status.HTTP_201_CREATED)
             except Exception as e:
                 logger.error(f"Error during user registration: {str(e)}")
                 return create_error_response(str(e), status.HTTP_500_INTERNAL_SERVER_ERROR)